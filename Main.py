@@ -273,6 +273,10 @@ async def shutdown_event():
         await x_client.__aexit__(None, None, None)
     if grok_client:
         await grok_client.__aexit__(None, None, None)
+    # 写入Cookie管理器中尚未保存的状态
+    for manager in (you_cookie_manager, x_credential_manager, grok_cookie_manager):
+        if manager:
+            manager.flush()
     logger.info("服务已关闭")
 
 # 处理请求的函数
@@ -709,12 +713,10 @@ async def list_models():
         # 获取You.com模型
         if you_client:
             try:
+                await you_client.ensure_ready()
                 you_models = you_client.list_models()
-                for model in you_models:
-                    # 保持原有前缀
-                    if not model["id"].startswith("You.com:"):
-                        model["id"] = f"You.com:{model['id']}"
-                    models_list["data"].append(model)
+                # list_models返回的id已带有You.com:前缀
+                models_list["data"].extend(you_models)
                 logger.info(f"获取到 {len(you_models)} 个You.com模型")
             except Exception as e:
                 logger.error(f"获取You.com模型失败: {str(e)}")
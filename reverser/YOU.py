@@ -6,12 +6,14 @@ import uuid
 import time
 import os
 import asyncio
-from typing import Dict, List, Optional, Generator, Any, AsyncGenerator
+from typing import Dict, List, Optional, Any, AsyncGenerator
 import aiohttp
 import requests
 import random
 from datetime import datetime
 
+from ._sse import SseState, sse_feed_chunk, sse_finish
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -63,7 +65,8 @@ class YouComReverser:
         self.email = "UNKNOWN"
         self.subscription_info = {}
         self.ai_models = []
-
+        self._models_cache: Optional[List[Dict]] = None
+        self._models_cache_key = None
         
         # 请求统计
         self.request_stats = {
@@ -72,9 +75,10 @@ class YouComReverser:
             "requests_by_date": {}
         }
         
-        # 获取初始数据
-        if cookies:
-            self._fetch_initial_data()
+        # 初始数据推迟到首次使用时异步获取，避免构造时阻塞事件循环
+        self._fetch_on_ready = bool(cookies)
+        self._ready = asyncio.Event()
+        self._ready_lock = asyncio.Lock()
         
         logger.info("You.com客户端初始化完成")
     
@@ -95,27 +99,41 @@ class YouComReverser:
             logger.error(f"更新Cookie失败: {str(e)}")
             return False
     
-    def _fetch_initial_data(self) -> None:
-        """从You.com获取初始数据"""
+    async def ensure_ready(self) -> None:
+        """确保初始数据已获取
+        
+        首次调用时异步获取初始数据，并发的首次调用者会等待同一次获取完成。
+        """
+        if self._ready.is_set():
+            return
+        
+        async with self._ready_lock:
+            if self._ready.is_set():
+                return
+            if self._fetch_on_ready:
+                await self._fetch_initial_data_async()
+            self._ready.set()
+    
+    async def _fetch_initial_data_async(self) -> None:
+        """从You.com异步获取初始数据"""
         logger.info("获取初始数据...")
+        url = f'{self.base_url}/_next/data/ee50cd42bdfa0bd3ad044daa2349a6179381d5ef/en-US/search.json'
         try:
-            response = requests.get(
-                headers=self.headers,
-                url=f'{self.base_url}/_next/data/ee50cd42bdfa0bd3ad044daa2349a6179381d5ef/en-US/search.json'
-            )
-            
-            # 检查是否需要更新Cookie
-            if response.status_code == 403:
-                logger.warning("Cookie已失效，尝试更新Cookie")
-                if self._update_cookie():
-                    # 重新尝试请求
-                    response = requests.get(
-                        headers=self.headers,
-                        url=f'{self.base_url}/_next/data/ee50cd42bdfa0bd3ad044daa2349a6179381d5ef/en-US/search.json'
-                    )
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url, headers=self.headers) as response:
+                    status = response.status
+                    data = await response.json(content_type=None) if status == 200 else None
+                
+                # 检查是否需要更新Cookie
+                if status == 403:
+                    logger.warning("Cookie已失效，尝试更新Cookie")
+                    if self._update_cookie():
+                        # 重新尝试请求
+                        async with session.get(url, headers=self.headers) as response:
+                            status = response.status
+                            data = await response.json(content_type=None) if status == 200 else None
             
-            if response.status_code == 200:
-                data = response.json()
+            if status == 200:
                 
                 # 从launchDarklyContext提取邮箱
                 launch_darkly_context = data.get("pageProps", {}).get("launchDarklyContext", {})
@@ -140,12 +158,14 @@ class YouComReverser:
                             }
                             logger.info(f"订阅: {self.subscription_info.get('service', 'unknown')} - {self.subscription_info.get('tier', 'unknown')}")
                 
-                # 提取AI模型
+                # 提取AI模型（同时使模型列表缓存失效）
+                self._models_cache = None
+                self._models_cache_key = None
                 self.ai_models = data.get("pageProps", {}).get("aiModels", [])
                 logger.info(f"找到 {len(self.ai_models)} 个AI模型")
                 
             else:
-                logger.error(f"获取初始数据错误: 状态码 {response.status_code}")
+                logger.error(f"获取初始数据错误: 状态码 {status}")
                 
         except Exception as e:
             logger.error(f"获取初始数据错误: {str(e)}")
@@ -174,8 +194,11 @@ class YouComReverser:
         """获取模型列表
         
         Returns:
-            模型列表
+            模型列表（在 ai_models 未变化时返回同一个缓存列表，调用方不得修改返回的列表和字典）
         """
+        if self._models_cache_key == id(self.ai_models):
+            return self._models_cache
+        
         model_list = []
         
         for model in self.ai_models:
@@ -190,6 +213,8 @@ class YouComReverser:
                 "context_length": model.get('contextLimit', 4096)
             })
         
+        self._models_cache = model_list
+        self._models_cache_key = id(self.ai_models)
         return model_list
     
     def upload_file(self, file_path: str) -> Dict:
@@ -282,128 +307,51 @@ class YouComReverser:
             logger.error(f"文件上传错误: {str(e)}")
             raise
         
-    def _parse_sse_response(self, response) -> Generator[Dict, None, None]:
-        """解析SSE响应
+    async def _parse_sse_response(self, reader, reuse_event: bool = False) -> AsyncGenerator[Dict, None]:
+        """异步解析SSE响应
         
         Args:
-            response: 请求响应对象
+            reader: 响应流读取器（asyncio.StreamReader 或 aiohttp 响应的 content）
+            reuse_event: 是否复用同一个字典产出token/thinking事件。
+                开启后，调用方必须在获取下一个事件前读取完所需字段，
+                不能保存产出的事件字典
                 
         Yields:
-            解析后的事件数据
+            解析后的事件数据（只读，可能是共享实例，调用方不得修改）
         """
-        try:
-            buffer = ""
-            thinking_mode = False
-            
-            # 逐行读取响应
-            for line in response.iter_lines():
-                # 添加错误处理，防止连接中断
-                try:
-                    if not line:
-                        # 空行表示事件结束
-                        if buffer:
-                            # 处理完整事件
-                            event_type = None
-                            event_data = None
-                            
-                            # 解析事件类型和数据
-                            for part in buffer.split('\n'):
-                                if part.startswith('event:'):
-                                    event_type = part[6:].strip()
-                                elif part.startswith('data:'):
-                                    event_data = part[5:].strip()
-                            
-                            # 处理事件
-                            if event_type and event_data:
-                                try:
-                                    data = json.loads(event_data)
-                                except json.JSONDecodeError:
-                                    data = event_data
-                                
-                                
-                                # 处理不同类型的事件
-                                if event_type == "youChatUpdate" and isinstance(data, dict) and "t" in data:
-                                    # 思维链部分
-                                    if not thinking_mode:
-                                        thinking_mode = True
-                                        yield {"type": "thinking_start"}
-                                    
-                                    thinking_content = data.get("t", "")
-                                    yield {
-                                        "type": "thinking",
-                                        "content": thinking_content
-                                    }
-                                elif event_type == "youChatToken":
-                                    # 实际回复部分
-                                    if thinking_mode:
-                                        thinking_mode = False
-                                        yield {"type": "thinking_end"}
-                                    
-                                    token = ""
-                                    if isinstance(data, dict):
-                                        token = data.get("youChatToken", "")
-                                    
-                                    yield {
-                                        "type": "token",
-                                        "content": token
-                                    }
-                                elif event_type == "done":
-                                    # 响应完成
-                                    if thinking_mode:
-                                        thinking_mode = False
-                                        yield {"type": "thinking_end"}
-                                    
-                                    yield {
-                                        "type": "done",
-                                        "content": data
-                                    }
-                                else:
-                                    # 其他事件类型
-                                    yield {
-                                        "type": event_type,
-                                        "content": data
-                                    }
-                            
-                            # 重置缓冲区
-                            buffer = ""
-                        continue
-                    
-                    # 将行添加到缓冲区
-                    line_str = line.decode('utf-8', errors='replace')
-                    if buffer:
-                        buffer += '\n'
-                    buffer += line_str
-                except Exception as line_error:
-                    logger.warning(f"处理SSE行时出错: {str(line_error)}")
-                    # 继续处理下一行，而不是中断整个流程
-                    continue
-            
-            # 确保思维模式正确结束
-            if thinking_mode:
-                yield {"type": "thinking_end"}
-                
-        except Exception as e:
-            # 详细的错误信息
-            logger.error(f"解析SSE响应错误: {str(e)}")
-            logger.error(f"响应状态码: {response.status_code}")
+        state = SseState(reuse_event)
+        
+        # 按块读取响应，由sse_feed_chunk完成事件分帧
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                break
+            for event in sse_feed_chunk(chunk, state):
+                yield event
+        
+        # 确保思维模式正确结束
+        for event in sse_finish(state):
+            yield event
+    
+    async def _iter_chat_output(self, response) -> AsyncGenerator[str, None]:
+        """将聊天响应的SSE事件转换为输出文本
+        
+        Args:
+            response: 聊天请求的aiohttp响应对象
             
-            # 尝试获取响应内容
-            try:
-                content_preview = ""
-                if hasattr(response, 'text'):
-                    content_preview = response.text[:1000]
-                elif hasattr(response, 'raw'):
-                    content_preview = response.raw.read(1000).decode('utf-8', errors='replace')
-            except:
-                content_preview = "无法获取响应内容"
-                
-            logger.error(f"响应内容前1000字符: {content_preview}")
-            # 不抛出异常，而是返回一个错误事件
-            yield {
-                "type": "error",
-                "content": f"解析SSE响应失败: <Response [{response.status_code}]>"
-            }
-                    
+        Yields:
+            思维链标记、思维链内容和回复token
+        """
+        async for event in self._parse_sse_response(response.content, reuse_event=True):
+            event_type = event["type"]
+            if event_type == "token" or event_type == "thinking":
+                yield event["content"]
+            elif event_type == "thinking_start":
+                yield "<Model_thinking>\n\n"
+            elif event_type == "thinking_end":
+                yield "\n\n</Model_thinking>\n\n"
+            elif event_type == "done":
+                break
     
     async def chat(self, 
                 message: str, 
@@ -412,6 +360,9 @@ class YouComReverser:
                 chat_mode: str = "custom") -> AsyncGenerator[str, None]:
         """发送聊天请求并处理响应（异步版本）"""
         
+        # 首次聊天前获取初始数据
+        await self.ensure_ready()
+        
         # 获取聊天模式（如果有Cookie管理器）
         if self.cookie_manager and hasattr(self.cookie_manager, 'get_chat_mode'):
             chat_mode = self.cookie_manager.get_chat_mode(model)
@@ -480,60 +431,8 @@ class YouComReverser:
                                     raise Exception(f"聊天请求失败: 状态码 {response.status}")
                                 
                                 # 处理响应
-                                full_response = ""
-                                in_thinking = False
-                                
-                                # 使用正确的流式处理方法
-                                buffer = ""
-                                async for chunk, _ in response.content.iter_chunks():
-                                    text = chunk.decode('utf-8', errors='replace')
-                                    buffer += text
-                                    
-                                    # 处理完整的SSE事件
-                                    while '\n\n' in buffer:
-                                        parts = buffer.split('\n\n', 1)
-                                        event_text = parts[0]
-                                        buffer = parts[1]
-                                        
-                                        # 解析事件
-                                        event_type = None
-                                        event_data = None
-                                        
-                                        for line in event_text.split('\n'):
-                                            if line.startswith('event:'):
-                                                event_type = line[6:].strip()
-                                            elif line.startswith('data:'):
-                                                event_data = line[5:].strip()
-                                        
-                                        # 处理事件
-                                        if event_type and event_data:
-                                            try:
-                                                data = json.loads(event_data)
-                                            except json.JSONDecodeError:
-                                                data = event_data
-                                            
-                                            # 处理不同类型的事件
-                                            if event_type == "youChatUpdate" and isinstance(data, dict) and "t" in data:
-                                                if not in_thinking:
-                                                    in_thinking = True
-                                                    yield "<Model_thinking>\n\n"
-                                                yield data.get("t", "")
-                                            elif event_type == "youChatToken":
-                                                if in_thinking:
-                                                    in_thinking = False
-                                                    yield "\n\n</Model_thinking>\n\n"
-                                                
-                                                token = ""
-                                                if isinstance(data, dict):
-                                                    token = data.get("youChatToken", "")
-                                                
-                                                full_response += token
-                                                yield token
-                                            elif event_type == "done":
-                                                if in_thinking:
-                                                    in_thinking = False
-                                                    yield "\n\n</Model_thinking>\n\n"
-                                                break
+                                async for text in self._iter_chat_output(response):
+                                    yield text
                         else:
                             raise Exception("更新Cookie失败")
                     
@@ -543,60 +442,9 @@ class YouComReverser:
                         logger.error(f"响应: {error_text}")
                         raise Exception(f"聊天请求失败: 状态码 {response.status}")
                     
-                    # 处理响应 - 使用正确的流式处理方法
-                    full_response = ""
-                    in_thinking = False
-                    
-                    buffer = ""
-                    async for chunk, _ in response.content.iter_chunks():
-                        text = chunk.decode('utf-8', errors='replace')
-                        buffer += text
-                        
-                        # 处理完整的SSE事件
-                        while '\n\n' in buffer:
-                            parts = buffer.split('\n\n', 1)
-                            event_text = parts[0]
-                            buffer = parts[1]
-                            
-                            # 解析事件
-                            event_type = None
-                            event_data = None
-                            
-                            for line in event_text.split('\n'):
-                                if line.startswith('event:'):
-                                    event_type = line[6:].strip()
-                                elif line.startswith('data:'):
-                                    event_data = line[5:].strip()
-                            
-                            # 处理事件
-                            if event_type and event_data:
-                                try:
-                                    data = json.loads(event_data)
-                                except json.JSONDecodeError:
-                                    data = event_data
-                                
-                                # 处理不同类型的事件
-                                if event_type == "youChatUpdate" and isinstance(data, dict) and "t" in data:
-                                    if not in_thinking:
-                                        in_thinking = True
-                                        yield "<Model_thinking>\n\n"
-                                    yield data.get("t", "")
-                                elif event_type == "youChatToken":
-                                    if in_thinking:
-                                        in_thinking = False
-                                        yield "\n\n</Model_thinking>\n\n"
-                                    
-                                    token = ""
-                                    if isinstance(data, dict):
-                                        token = data.get("youChatToken", "")
-                                    
-                                    full_response += token
-                                    yield token
-                                elif event_type == "done":
-                                    if in_thinking:
-                                        in_thinking = False
-                                        yield "\n\n</Model_thinking>\n\n"
-                                    break
+                    # 处理响应
+                    async for text in self._iter_chat_output(response):
+                        yield text
 
         except Exception as e:
             logger.error(f"聊天请求错误: {str(e)}")
@@ -729,101 +577,3 @@ class YouComReverser:
             self.cookie_rotation_mode = mode
             
         return self._update_cookie()
-    
-    async def _parse_sse_response_async(self, response) -> AsyncGenerator[Dict, None]:
-        """异步解析SSE响应
-        
-        Args:
-            response: 异步请求响应对象
-                
-        Yields:
-            解析后的事件数据
-        """
-        buffer = ""
-        thinking_mode = False
-        
-        # 逐行读取响应
-        async for line in response.content:
-            try:
-                line_str = line.decode('utf-8', errors='replace')
-                
-                if not line_str.strip():
-                    # 空行表示事件结束
-                    if buffer:
-                        # 处理完整事件
-                        event_type = None
-                        event_data = None
-                        
-                        # 解析事件类型和数据
-                        for part in buffer.split('\n'):
-                            if part.startswith('event:'):
-                                event_type = part[6:].strip()
-                            elif part.startswith('data:'):
-                                event_data = part[5:].strip()
-                        
-                        # 处理事件
-                        if event_type and event_data:
-                            try:
-                                data = json.loads(event_data)
-                            except json.JSONDecodeError:
-                                data = event_data
-                            
-                            # 处理不同类型的事件
-                            if event_type == "youChatUpdate" and isinstance(data, dict) and "t" in data:
-                                # 思维链部分
-                                if not thinking_mode:
-                                    thinking_mode = True
-                                    yield {"type": "thinking_start"}
-                                
-                                thinking_content = data.get("t", "")
-                                yield {
-                                    "type": "thinking",
-                                    "content": thinking_content
-                                }
-                            elif event_type == "youChatToken":
-                                # 实际回复部分
-                                if thinking_mode:
-                                    thinking_mode = False
-                                    yield {"type": "thinking_end"}
-                                
-                                token = ""
-                                if isinstance(data, dict):
-                                    token = data.get("youChatToken", "")
-                                
-                                yield {
-                                    "type": "token",
-                                    "content": token
-                                }
-                            elif event_type == "done":
-                                # 响应完成
-                                if thinking_mode:
-                                    thinking_mode = False
-                                    yield {"type": "thinking_end"}
-                                
-                                yield {
-                                    "type": "done",
-                                    "content": data
-                                }
-                            else:
-                                # 其他事件类型
-                                yield {
-                                    "type": event_type,
-                                    "content": data
-                                }
-                        
-                        # 重置缓冲区
-                        buffer = ""
-                    continue
-                
-                # 将行添加到缓冲区
-                if buffer:
-                    buffer += '\n'
-                buffer += line_str
-            except Exception as line_error:
-                logger.warning(f"处理SSE行时出错: {str(line_error)}")
-                # 继续处理下一行，而不是中断整个流程
-                continue
-        
-        # 确保思维模式正确结束
-        if thinking_mode:
-            yield {"type": "thinking_end"}
\ No newline at end of file
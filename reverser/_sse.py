@@ -0,0 +1,281 @@
+# You.com SSE流解析的热路径
+# 本模块保持为带完整类型注解的纯Python代码，可直接用 mypyc 编译为C扩展:
+#     mypyc reverser/_sse.py
+# 编译生成的扩展模块与本文件同名，存在时会被优先导入；未编译时即以纯Python运行
+#
+# 注意：不要对本模块使用 Numba（@njit）
+# Numba nopython 模式不支持这里大量使用的 str、dict、json.loads 以及生成器 yield，
+# 强行加装饰器只会编译失败并增加导入开销；热循环需要编译时请使用上面的 mypyc。
+# 如果以后加入纯数值的后处理（例如按时间戳统计token速率），应将其拆成独立函数，
+# 接收 int64 的 np.ndarray 时间戳，仅在该函数上使用 @njit(cache=True)
+import re
+import sys
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+_loads: Callable[[bytes], Any]
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
+# SSE事件类型
+_EVT_UPDATE = "youChatUpdate"
+_EVT_TOKEN = "youChatToken"
+_EVT_DONE = "done"
+
+# 已知事件类型的bytes到str映射，避免逐个解码事件名
+_EVT_STR = {
+    b"youChatUpdate": _EVT_UPDATE,
+    b"youChatToken": _EVT_TOKEN,
+    b"done": _EVT_DONE,
+}
+
+# You.com通常只发送 event 行加 data 行的事件，整个事件与之完全匹配时直接取出两个字段；
+# 含有其他字段（id:、retry:、注释行）或字段顺序不同的事件逐行解析
+_EVT_RE = re.compile(
+    rb"event:[ \t]*(?P<e>[^\r\n]*?)[ \t]*\r?\n"
+    rb"data:[ \t]*(?P<d>[^\r\n]*?)[ \t]*\r?"
+)
+
+# 产出事件的type取值，显式驻留以便调用方比较时走引用相等的快速路径
+_T_TOKEN = sys.intern("token")
+_T_THINK = sys.intern("thinking")
+_T_DONE = sys.intern("done")
+_T_START = sys.intern("thinking_start")
+_T_END = sys.intern("thinking_end")
+
+# 无可变内容事件的共享实例（调用方不得修改产出的事件字典）
+_EMPTY_THINKING = {"type": _T_THINK, "content": ""}
+_EMPTY_TOKEN = {"type": _T_TOKEN, "content": ""}
+_THINK_START = {"type": _T_START}
+_THINK_END = {"type": _T_END}
+
+_TOKEN_PREFIX = b'{"youChatToken":"'
+_TOKEN_SUFFIX = b'"}'
+
+
+class SseState:
+    """单个SSE流的解析状态
+
+    产出的事件字典可能是模块级共享实例（如空内容事件）或复用的字典，
+    调用方只能读取，不得修改
+    """
+
+    def __init__(self, reuse_event: bool = False):
+        """初始化解析状态
+
+        Args:
+            reuse_event: 是否复用同一个字典产出token/thinking事件
+        """
+        self.thinking_mode: bool = False
+        # 尚未以空行结束的不完整事件数据
+        self.pending = bytearray()
+        self.evt: Optional[Dict[str, Any]] = {"type": "", "content": ""} if reuse_event else None
+
+
+def _handle_update(data: Any, state: SseState) -> Iterable[Dict[str, Any]]:
+    """处理youChatUpdate事件（思维链部分）"""
+    if not (type(data) is dict and "t" in data):
+        # 不含思维链内容的更新按普通事件处理
+        return ({"type": _EVT_UPDATE, "content": data},)
+
+    return _emit_thinking(data["t"], state)
+
+
+def _emit_thinking(thinking_content: str, state: SseState) -> Iterable[Dict[str, Any]]:
+    """产出thinking事件，必要时先开始思维模式"""
+    if not state.thinking_mode:
+        state.thinking_mode = True
+        yield _THINK_START
+
+    if not thinking_content:
+        yield _EMPTY_THINKING
+        return
+
+    evt = state.evt
+    if evt is None:
+        yield {
+            "type": _T_THINK,
+            "content": thinking_content
+        }
+    else:
+        evt["type"] = _T_THINK
+        evt["content"] = thinking_content
+        yield evt
+
+
+def _handle_token(data: Any, state: SseState) -> Iterable[Dict[str, Any]]:
+    """处理youChatToken事件（实际回复部分）"""
+    token = ""
+    if type(data) is dict:
+        try:
+            token = data["youChatToken"]
+        except KeyError:
+            pass
+
+    return _emit_token(token, state)
+
+
+def _emit_token(token: str, state: SseState) -> Iterable[Dict[str, Any]]:
+    """产出token事件，必要时先结束思维模式"""
+    if state.thinking_mode:
+        state.thinking_mode = False
+        yield _THINK_END
+
+    if not token:
+        yield _EMPTY_TOKEN
+        return
+
+    evt = state.evt
+    if evt is None:
+        yield {
+            "type": _T_TOKEN,
+            "content": token
+        }
+    else:
+        evt["type"] = _T_TOKEN
+        evt["content"] = token
+        yield evt
+
+
+def _handle_done(data: Any, state: SseState) -> Iterable[Dict[str, Any]]:
+    """处理done事件（响应完成）"""
+    if state.thinking_mode:
+        state.thinking_mode = False
+        yield _THINK_END
+
+    yield {
+        "type": _T_DONE,
+        "content": data
+    }
+
+
+_HANDLERS = {
+    _EVT_UPDATE: _handle_update,
+    _EVT_TOKEN: _handle_token,
+    _EVT_DONE: _handle_done,
+}
+
+
+def _fast_token(event_data: bytes) -> Optional[str]:
+    """不经JSON解析直接提取youChatToken事件中的token
+
+    仅处理形如 {"youChatToken":"..."} 且不含转义字符和引号的数据
+
+    Returns:
+        token字符串，无法快速提取时返回None
+    """
+    if (len(event_data) > 18
+            and event_data.startswith(_TOKEN_PREFIX)
+            and event_data.endswith(_TOKEN_SUFFIX)):
+        token = event_data[17:-2]
+        if b'\\' not in token and b'"' not in token:
+            return token.decode('utf-8', errors='replace')
+    return None
+
+
+def _decode(event_data: bytes) -> Any:
+    """解析事件数据，不是合法JSON时按文本返回"""
+    try:
+        return _loads(event_data)
+    except ValueError:
+        return event_data.decode('utf-8', errors='replace')
+
+
+def _dispatch_data(event_type: str, data: Any, state: SseState) -> Iterable[Dict[str, Any]]:
+    """将已解析的事件数据分派给对应的处理函数"""
+    handler = _HANDLERS.get(event_type)
+    if handler is not None:
+        return handler(data, state)
+
+    # 其他事件类型
+    return ({
+        "type": event_type,
+        "content": data
+    },)
+
+
+def _dispatch_event(event_type: str, event_data: bytes, state: SseState) -> Iterable[Dict[str, Any]]:
+    """解析一个完整的SSE事件并分派给对应的处理函数
+
+    Returns:
+        产出事件字典的可迭代对象
+    """
+    # youChatToken是最频繁的事件，先尝试跳过JSON解析的快速路径
+    if event_type == _EVT_TOKEN:
+        token = _fast_token(event_data)
+        if token is not None:
+            return _emit_token(token, state)
+
+    return _dispatch_data(event_type, _decode(event_data), state)
+
+
+def _event_fields(raw: bytes) -> Tuple[bytes, bytes]:
+    """取出一个事件中的event和data字段，字段顺序任意，其他字段和注释行忽略
+
+    Returns:
+        (事件名, 事件数据)，缺少的字段为空bytes
+    """
+    m = _EVT_RE.fullmatch(raw)
+    if m is not None:
+        return m.group("e"), m.group("d")
+
+    event_name = b""
+    event_data = b""
+    for line in raw.split(b"\n"):
+        if line.startswith(b"event:"):
+            event_name = line[6:].strip()
+        elif line.startswith(b"data:"):
+            event_data = line[5:].strip()
+    return event_name, event_data
+
+
+def _dispatch_block(block: bytes, state: SseState) -> Iterable[Dict[str, Any]]:
+    """按空行拆分一段完整事件数据中的所有事件并逐个分派"""
+    for raw in block.split(b"\n\n"):
+        event_name, event_data = _event_fields(raw)
+        if not (event_name and event_data):
+            continue
+
+        event_type = _EVT_STR.get(event_name)
+        if event_type is None:
+            event_type = event_name.decode('utf-8', errors='replace')
+        yield from _dispatch_event(event_type, event_data, state)
+
+
+def sse_feed_chunk(chunk: bytes, state: SseState) -> Iterable[Dict[str, Any]]:
+    """处理一段接收到的SSE原始数据
+
+    数据先追加到缓冲区，缓冲区中以空行结束的部分按空行拆分为事件，
+    最后一个不完整的事件留在缓冲区等待后续数据
+
+    Args:
+        chunk: 未解码的原始数据块
+        state: 当前流的解析状态
+
+    Returns:
+        产出事件字典的可迭代对象
+    """
+    pending = state.pending
+    pending += chunk
+    end = pending.rfind(b"\n\n")
+    if end < 0:
+        return ()
+
+    block = bytes(pending[:end])
+    del pending[:end + 2]
+    return _dispatch_block(block, state)
+
+
+def sse_finish(state: SseState) -> Iterable[Dict[str, Any]]:
+    """流结束时的收尾处理：分派缓冲区中剩余的事件，并确保思维模式正确结束"""
+    if state.pending:
+        block = bytes(state.pending)
+        state.pending.clear()
+        yield from _dispatch_block(block, state)
+
+    if state.thinking_mode:
+        state.thinking_mode = False
+        yield _THINK_END
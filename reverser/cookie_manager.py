@@ -1,14 +1,195 @@
+import atexit
+import gzip
+import heapq
 import json
 import logging
 import os
 import random
-from typing import Dict, List, Optional, Any, Union
-from datetime import datetime, timedelta
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Any, Union, Callable
+from datetime import datetime
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.cookiejar import CookieJar, DefaultCookiePolicy
 import httpx
+
+# msgpack为可选依赖，安装后状态文件以二进制格式保存
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# orjson为可选依赖，安装后用于解析验证响应
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# zstandard为可选依赖，未安装时使用gzip压缩状态文件
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 验证等请求使用的浏览器User-Agent
+_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# You.com验证响应中邮箱和订阅等级的位置（不跨越嵌套对象，匹配不到时回退到完整JSON解析）
+_YOU_EMAIL_RE = re.compile(rb'"launchDarklyContext":\{[^{}]*?"email":"([^"\\]*)"')
+_YOU_TIER_RE = re.compile(
+    rb'"youProState":(?:null|\{[^{}\[\]]*?"subscriptions":\['
+    rb'(?:\]|\{[^{}\[\]]*?"tier":"([^"\\]*)"))'
+)
+
+
+def _extract_you_account(content: bytes) -> Optional[tuple]:
+    """从You.com验证响应的原始数据中提取邮箱和订阅等级
+    
+    Args:
+        content: 响应的原始数据
+        
+    Returns:
+        (邮箱, 订阅等级)，无法定位字段时返回None
+    """
+    email_match = _YOU_EMAIL_RE.search(content)
+    tier_match = _YOU_TIER_RE.search(content)
+    if email_match is None or tier_match is None:
+        return None
+    
+    email = email_match.group(1).decode('utf-8', errors='replace')
+    tier = tier_match.group(1)
+    # youProState为空或没有订阅时为免费用户
+    subscription_tier = tier.decode('utf-8', errors='replace') if tier is not None else "free"
+    return email, subscription_tier
+
+
+def _preview(text: str) -> str:
+    """生成Cookie的预览字符串（只显示前20个字符）"""
+    return text[:20] + "..." if len(text) > 20 else text
+
+
+# 压缩格式的文件头，用于加载时识别状态文件是否压缩
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+# 压缩保存的状态文件在原文件名后追加的后缀
+_COMPRESSED_SUFFIXES = (".zst", ".gz")
+
+
+def _compress(data: bytes) -> bytes:
+    """以最快的压缩级别压缩状态数据（优先使用zstd）"""
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=1).compress(data)
+    return gzip.compress(data, compresslevel=1)
+
+
+def _compressed_suffix() -> str:
+    """获取_compress当前使用的压缩格式对应的文件后缀"""
+    return ".zst" if zstandard is not None else ".gz"
+
+
+def _decompress(data: bytes) -> bytes:
+    """根据文件头解压状态数据，未压缩的数据原样返回"""
+    if data.startswith(_ZSTD_MAGIC):
+        if zstandard is None:
+            raise Exception("状态文件使用zstd压缩，需要安装zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if data.startswith(_GZIP_MAGIC):
+        return gzip.decompress(data)
+    return data
+
+
+# 本进程中已确认存在的目录，多个管理器初始化时不再重复创建
+_ensured_dirs = set()
+
+
+def _ensure_dir(path: str):
+    """创建目录（如果不存在），每个目录在进程内只处理一次"""
+    if path and path not in _ensured_dirs:
+        os.makedirs(path, exist_ok=True)
+        _ensured_dirs.add(path)
+
+
+# 所有管理器共享的同步HTTP客户端，通过连接池复用TCP/TLS连接
+_http_client: Optional[httpx.Client] = None
+
+
+def _get_http_client() -> httpx.Client:
+    """获取共享的HTTP客户端，首次调用时创建（安装了h2时启用HTTP/2）
+    
+    客户端被所有账号和验证线程共用，其Cookie容器拒绝保存任何Cookie：
+    否则一个账号响应中的Set-Cookie会留在容器中，跟随重定向时httpx会丢弃显式的Cookie请求头
+    并改为发送容器中的Cookie，导致请求以其他账号的身份发出
+    """
+    global _http_client
+    if _http_client is None:
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+        _http_client = httpx.Client(
+            http2=http2,
+            timeout=10.0,
+            # 与之前使用的requests一致，自动跟随重定向
+            follow_redirects=True,
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+            limits=httpx.Limits(max_keepalive_connections=32)
+        )
+    return _http_client
+
+# Grok.com验证请求的(连接, 读取)超时秒数，避免服务端无响应时阻塞验证线程
+_GROK_VALIDATION_TIMEOUT = (3.05, 10)
+
+
+class _RWLock:
+    """读写锁：读操作之间可以并发，写操作独占；有写操作等待时新的读操作先等待，避免写操作饥饿"""
+    
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+    
+    @contextmanager
+    def read(self):
+        """获取读锁"""
+        with self._cond:
+            while self._writing or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+    
+    @contextmanager
+    def write(self):
+        """获取写锁"""
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+
 class BaseCookieManager:
     """Cookie管理的基类，提供通用功能"""
     
@@ -21,42 +202,271 @@ class BaseCookieManager:
         """
         self.config = config
         self.state_file = state_file
+        # 实际读写的状态文件，安装了msgpack时使用同名的.msgpack文件；压缩保存时再追加压缩格式的后缀
+        if msgpack is not None:
+            self._state_path = os.path.splitext(state_file)[0] + ".msgpack"
+        else:
+            self._state_path = state_file
+        # 状态文件存在但无法解析（如缺少zstandard）时不再保存，避免覆盖其中的数据
+        self._state_unreadable = False
         self.cookie_states = {}
         self.current_index = 0
-        self.valid_indices = []
+        # 可用（有效且未冷却）掩码，按索引直接翻转，避免列表的查找和删除
+        self._alive_mask: List[bool] = []
+        self._alive_count = 0
+        # 按索引排列的请求次数，是请求计数的权威数据，保存时才写回cookie_states
+        self.request_counts: List[int] = []
+        # least_used策略使用的(请求次数, 索引)小根堆，过期条目在取出时惰性丢弃
+        self._usage_heap: List[tuple] = []
+        # 冷却中Cookie的(monotonic截止时间, 索引, 冷却截止时间戳)小根堆
+        self._cooldown_heap: List[tuple] = []
+        self._cookie_ids: List[str] = []  # 各Cookie的状态键，由子类设置
+        self._log_name = "Cookie"  # 日志中Cookie的称呼，由子类设置
+        # 按索引排列的各Cookie状态，与cookie_states中的字典是同一对象，热路径按索引直接访问
+        self._states: List[Dict[str, Any]] = []
+        # random策略使用独立的随机数生成器，按打乱后的索引序列依次选取
+        self._rng = random.Random()
+        self._shuffle: List[int] = []
+        self._shuffle_cursor = 0
         self.rotation_count = 0  # 用于跟踪聊天次数，决定何时轮换
+        # 状态事件的监听函数，以(事件类型, 事件数据)调用
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        # 配置的冷却时长（秒），开始冷却时直接使用
+        self._cooldown_seconds = self.get_cooldown_minutes() * 60
+        # 缓存的轮换策略及其选择函数，每次选择时不再查询配置（通过set_rotation_strategy修改）
+        self._rotation_strategy = self.get_rotation_strategy()
+        self._bind_strategy()
+        self._http = _get_http_client()
+        # 并发验证使用的线程池，首次需要时创建并在之后的验证中复用
+        self._validation_executor: Optional[ThreadPoolExecutor] = None
+        self._base_headers = {"User-Agent": _USER_AGENT}  # 各请求共用的固定请求头
+        self._last_full_validation_ts = 0.0  # 上次完整验证的时间（monotonic）
+        self._now_iso_cache = (-1, "")  # (monotonic秒数, ISO时间字符串)
+        # 统计信息缓存，状态修改时递增_stats_version使其失效
+        self._stats_version = 0
+        self._stats_cache = (-1, None)
+        
+        # 状态修改后只递增版本号，由定时器合并写盘；版本号与已保存版本相同时跳过写入
+        self._version = 0
+        self._last_saved_version = 0
+        self._last_saved_data: Optional[bytes] = None  # 上次写入的序列化数据（压缩前）
+        self._flush_timer = None
+        self._flush_lock = threading.Lock()
+        # 保护版本号的递增和定时器的创建（+=不是原子操作，并发修改时会丢失递增）
+        self._timer_lock = threading.Lock()
+        # 保护cookie_states及按索引排列的可用掩码、请求次数和各个堆的读写锁：
+        # 修改时持有写锁，保存序列化和生成统计时持有读锁；锁不可重入，持有时不得调用_mark_dirty
+        self._state_lock = _RWLock()
+        # 进程正常退出时写入尚未保存的修改（定时器线程为守护线程，退出时不会等待）
+        atexit.register(self.flush)
         
         # 创建logs目录（如果不存在）
-        os.makedirs("logs", exist_ok=True)
-        os.makedirs(os.path.dirname(state_file), exist_ok=True)
+        _ensure_dir("logs")
+        _ensure_dir(os.path.dirname(state_file))
         
         # 加载保存的状态
         self._load_state()
     
+    def _find_state_file(self, base: str) -> Optional[str]:
+        """查找指定状态文件及其压缩版本中最近修改的一个
+        
+        Args:
+            base: 未压缩时的状态文件路径
+            
+        Returns:
+            存在的文件路径，都不存在时返回None
+        """
+        paths = [path for path in [base] + [base + suffix for suffix in _COMPRESSED_SUFFIXES] if os.path.exists(path)]
+        if not paths:
+            return None
+        return max(paths, key=os.path.getmtime)
+    
     def _load_state(self):
-        """从文件加载Cookie状态"""
-        if os.path.exists(self.state_file):
-            try:
-                with open(self.state_file, 'r', encoding='utf-8') as f:
-                    self.cookie_states = json.load(f)
-                logger.info(f"已从 {self.state_file} 加载Cookie状态")
-            except Exception as e:
-                logger.error(f"加载Cookie状态失败: {str(e)}")
-                self.cookie_states = {}
+        """从文件加载Cookie状态
+        
+        优先读取msgpack状态文件；不存在时读取JSON状态文件（兼容从旧版本升级）。
+        文件存在但无法解析时保留该文件，本次运行不再保存状态
+        """
+        path = None
+        try:
+            if self._state_path != self.state_file:
+                path = self._find_state_file(self._state_path)
+            if path is not None:
+                with open(path, 'rb') as f:
+                    self.cookie_states = msgpack.unpackb(_decompress(f.read()), raw=False)
+                logger.info(f"已从 {path} 加载Cookie状态")
+                return
+            
+            path = self._find_state_file(self.state_file)
+            if path is not None:
+                with open(path, 'rb') as f:
+                    self.cookie_states = json.loads(_decompress(f.read()))
+                logger.info(f"已从 {path} 加载Cookie状态")
+        except Exception as e:
+            logger.error(f"加载Cookie状态失败: {str(e)}，为避免覆盖 {path}，本次运行不会保存Cookie状态")
+            self.cookie_states = {}
+            self._state_unreadable = True
     
     def _save_state(self):
         """保存Cookie状态到文件"""
+        if self._state_unreadable:
+            return
+        
+        # 先记录版本号，序列化期间发生的修改会在下次保存时写入
+        version = self._version
         try:
-            with open(self.state_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cookie_states, f, indent=2)
-            logger.debug(f"已保存Cookie状态到 {self.state_file}")
+            # 写回请求次数会修改状态字典，需要写锁；之后的序列化只读取，持有读锁即可
+            with self._state_lock.write():
+                self._sync_request_counts()
+            with self._state_lock.read():
+                if msgpack is not None:
+                    data = msgpack.packb(self.cookie_states, use_bin_type=True)
+                elif logger.isEnabledFor(logging.DEBUG):
+                    # 仅在DEBUG日志级别下保留缩进格式便于查看（此时不压缩）
+                    data = json.dumps(self.cookie_states, indent=2).encode('utf-8')
+                else:
+                    data = json.dumps(self.cookie_states, separators=(",", ":")).encode('utf-8')
+            
+            # 修改后又恢复原值等情况下内容与上次写入相同，跳过压缩和写盘
+            if data == self._last_saved_data:
+                self._last_saved_version = version
+                logger.debug("Cookie状态未变化，跳过保存")
+                return
+            serialized = data
+            
+            path = self._state_path
+            if self.config.get("compress_state", True) and not (msgpack is None and logger.isEnabledFor(logging.DEBUG)):
+                data = _compress(data)
+                path += _compressed_suffix()
+            self._write_atomic(path, data)
+            self._last_saved_data = serialized
+            self._last_saved_version = version
+            logger.debug(f"已保存Cookie状态到 {path}")
         except Exception as e:
             logger.error(f"保存Cookie状态失败: {str(e)}")
     
+    def export_state_json(self, path: Optional[str] = None) -> str:
+        """将Cookie状态导出为便于阅读的JSON文件
+        
+        Args:
+            path: 导出文件路径，默认为JSON状态文件路径
+            
+        Returns:
+            导出文件的路径
+        """
+        path = path or self.state_file
+        with self._state_lock.write():
+            self._sync_request_counts()
+        with self._state_lock.read():
+            data = json.dumps(self.cookie_states, indent=2, ensure_ascii=False).encode('utf-8')
+        self._write_atomic(path, data)
+        logger.info(f"已导出Cookie状态到 {path}")
+        return path
+    
+    def _write_atomic(self, path: str, data: bytes):
+        """将数据写入临时文件并替换目标文件，避免写入中途崩溃导致文件损坏
+        
+        Args:
+            path: 目标文件路径
+            data: 要写入的完整文件内容
+        """
+        tmp_file = path + ".tmp"
+        # Windows下需要O_BINARY，否则换行符会被转换
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+        fd = os.open(tmp_file, flags, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_file, path)
+    
+    def add_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        """注册状态事件的监听函数（用于统计、监控等）
+        
+        事件类型包括 rotation、invalid、cooldown_start 和 cooldown_end，
+        监听函数在修改状态的线程中同步调用，应尽快返回
+        
+        Args:
+            listener: 以(事件类型, 事件数据)调用的函数
+        """
+        self._listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        """移除已注册的监听函数
+        
+        Args:
+            listener: 要移除的监听函数
+        """
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+    
+    def _emit(self, kind: str, payload: Dict[str, Any]):
+        """通知所有监听函数，单个监听函数出错不影响其他监听函数和调用方
+        
+        Args:
+            kind: 事件类型
+            payload: 事件数据
+        """
+        for listener in self._listeners:
+            try:
+                listener(kind, payload)
+            except Exception as e:
+                logger.error(f"状态事件监听函数出错: {str(e)}")
+    
+    def _mark_dirty(self):
+        """标记状态已修改，在保存间隔到达后统一写入文件"""
+        with self._timer_lock:
+            self._version += 1
+            self._stats_version += 1
+            if self._flush_timer is not None:
+                return
+            
+            interval = self.get_save_interval_seconds()
+            if interval > 0:
+                # 并发验证时多个线程可能同时标记，只启动一个定时器
+                self._flush_timer = threading.Timer(interval, self._on_flush_timer)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+                return
+        
+        # 间隔为0表示每次修改都立即保存
+        self.flush()
+    
+    def _on_flush_timer(self):
+        """定时器回调，写入积累的状态修改"""
+        with self._timer_lock:
+            self._flush_timer = None
+        self.flush()
+    
+    def flush(self):
+        """立即保存尚未写入文件的状态修改（用于关闭服务时）"""
+        with self._flush_lock:
+            if self._version == self._last_saved_version:
+                return
+            self._save_state()
+    
+    def get_save_interval_seconds(self) -> float:
+        """获取状态保存间隔（秒）"""
+        return self.config.get("save_interval_seconds", 5)
+    
     def get_rotation_strategy(self) -> str:
         """获取轮换策略"""
         return self.config.get("rotation_strategy", "round_robin")
     
+    def set_rotation_strategy(self, strategy: str):
+        """修改轮换策略，同时更新配置和缓存的策略
+        
+        Args:
+            strategy: 轮换策略名称
+        """
+        self.config["rotation_strategy"] = strategy
+        self._rotation_strategy = strategy
+        self._bind_strategy()
+    
     def get_rotation_interval(self) -> int:
         """获取轮换间隔"""
         return self.config.get("rotation_interval", 3)
@@ -72,6 +482,299 @@ class BaseCookieManager:
         """获取验证间隔（小时）"""
         return self.config.get("validation_interval_hours", 1)
     
+    def _now_iso(self) -> str:
+        """获取当前时间的ISO格式字符串，同一秒内复用已生成的字符串"""
+        second = int(time.monotonic())
+        cached_second, cached_iso = self._now_iso_cache
+        if second == cached_second:
+            return cached_iso
+        now_iso = datetime.now().isoformat()
+        self._now_iso_cache = (second, now_iso)
+        return now_iso
+    
+    def _cooldown_deadline(self, state: Dict[str, Any]) -> Optional[float]:
+        """获取冷却结束的时间戳
+        
+        旧版状态文件只保存ISO格式的next_available，首次读取时解析一次并写入next_available_ts，
+        因此调用方需持有写锁
+        
+        Args:
+            state: Cookie或聊天模式的状态
+            
+        Returns:
+            冷却结束的时间戳，未设置时返回None
+        """
+        deadline = state.get("next_available_ts")
+        if deadline is None:
+            next_available = state.get("next_available")
+            if not next_available:
+                return None
+            deadline = datetime.fromisoformat(next_available).timestamp()
+            state["next_available_ts"] = deadline
+        return deadline
+    
+    def _rebuild_cooldown_heap(self, states: List[Dict[str, Any]]):
+        """根据各Cookie的状态重建冷却截止时间小根堆（调用方需持有写锁）
+        
+        Args:
+            states: 按索引排列的Cookie状态
+        """
+        # 保存的截止时间是时间戳（跨进程有效），进程内换算为monotonic时间比较，
+        # 系统时间被调整（NTP校时等）时不会导致冷却提前结束或迟迟不结束
+        offset = time.monotonic() - time.time()
+        heap = []
+        for i, state in enumerate(states):
+            if state.get("is_cooling", False):
+                deadline = self._cooldown_deadline(state)
+                if deadline is not None:
+                    heap.append((deadline + offset, i, deadline))
+        heapq.heapify(heap)
+        self._cooldown_heap = heap
+    
+    def _push_cooldown(self, index: int, deadline: float):
+        """将新开始的冷却加入截止时间小根堆（调用方需持有写锁）
+        
+        Args:
+            index: Cookie索引
+            deadline: 冷却截止时间戳
+        """
+        heapq.heappush(self._cooldown_heap, (time.monotonic() + (deadline - time.time()), index, deadline))
+    
+    def _pop_expired_cooldowns(self) -> List[int]:
+        """取出冷却截止时间已过的索引
+        
+        只检查堆顶，已结束或被重新开始的冷却留下的旧条目在此丢弃
+        
+        Returns:
+            冷却已结束的索引列表
+        """
+        now = time.monotonic()
+        expired = []
+        # 每次选择Cookie都会检查，堆顶未到期时不获取写锁（切片读取堆顶，不受其他线程弹出影响）
+        top = self._cooldown_heap[:1]
+        if not top or top[0][0] > now:
+            return expired
+        
+        with self._state_lock.write():
+            heap = self._cooldown_heap
+            while heap and heap[0][0] <= now:
+                _, index, deadline = heapq.heappop(heap)
+                state = self._states[index]
+                if state.get("is_cooling", False) and self._cooldown_deadline(state) == deadline:
+                    expired.append(index)
+        return expired
+    
+    def _full_validation_due(self) -> bool:
+        """判断距上次完整验证是否已超过验证间隔"""
+        elapsed = time.monotonic() - self._last_full_validation_ts
+        return elapsed > self.get_validation_interval_hours() * 3600
+    
+    def _reset_alive(self, count: int):
+        """重置可用掩码，所有索引标记为不可用（调用方需持有写锁）
+        
+        Args:
+            count: Cookie数量
+        """
+        self._alive_mask = [False] * count
+        self._alive_count = 0
+        with self._timer_lock:
+            self._stats_version += 1
+    
+    def _set_alive(self, index: int, alive: bool):
+        """设置指定索引是否可用（调用方需持有写锁）
+        
+        Args:
+            index: Cookie索引
+            alive: 是否可用
+        """
+        if self._alive_mask[index] != alive:
+            self._alive_mask[index] = alive
+            self._alive_count += 1 if alive else -1
+            # 重新可用时其旧的堆条目可能已被丢弃，重新加入
+            if alive and index < len(self.request_counts):
+                heapq.heappush(self._usage_heap, (self.request_counts[index], index))
+    
+    def _alive_indices(self) -> List[int]:
+        """获取所有可用的索引"""
+        return [i for i, alive in enumerate(self._alive_mask) if alive]
+    
+    def _bind_states(self):
+        """建立按索引排列的状态列表，并读取各索引的请求次数（子类初始化cookie_states后调用）"""
+        self._states = [self.cookie_states[state_id] for state_id in self._cookie_ids]
+        self.request_counts = [int(state.get("request_count", 0) or 0) for state in self._states]
+    
+    def _sync_request_counts(self):
+        """将请求次数写回cookie_states，保存或导出状态前调用（调用方需持有写锁）"""
+        for state, count in zip(self._states, self.request_counts):
+            state["request_count"] = count
+    
+    def _rebuild_usage_heap(self):
+        """根据各索引的请求次数重建least_used小根堆（调用方需持有写锁）"""
+        self._usage_heap = [(count, i) for i, count in enumerate(self.request_counts) if self._alive_mask[i]]
+        heapq.heapify(self._usage_heap)
+    
+    def _record_usage(self, index: int):
+        """增加指定索引的请求次数
+        
+        Args:
+            index: Cookie索引
+        """
+        with self._state_lock.write():
+            self.request_counts[index] += 1
+            if not self._alive_mask[index]:
+                return
+            
+            # 过期条目积累过多时重建，避免堆无限增长
+            if len(self._usage_heap) > 4 * len(self.request_counts) + 16:
+                self._rebuild_usage_heap()
+            else:
+                heapq.heappush(self._usage_heap, (self.request_counts[index], index))
+    
+    def _least_used_index(self) -> int:
+        """获取请求次数最少的可用索引（调用前需确保存在可用索引）"""
+        heap = self._usage_heap
+        while heap:
+            count, index = heap[0]
+            if self._alive_mask[index] and self.request_counts[index] == count:
+                return index
+            # 已不可用或次数已过期的条目直接丢弃
+            heapq.heappop(heap)
+        
+        # 堆中条目全部过期时按当前次数重建
+        self._rebuild_usage_heap()
+        heap = self._usage_heap
+        return heap[0][1] if heap else self._alive_indices()[0]
+    
+    def _pick_next_index(self, exhausted_error: str) -> int:
+        """选择下一个要使用的索引并记录使用时间（各管理器get_next_cookie的公共部分）
+        
+        Args:
+            exhausted_error: 没有可用索引时抛出的异常信息
+            
+        Returns:
+            选中的索引，同时保存在current_index中
+            
+        Raises:
+            Exception: 当没有可用索引时抛出
+        """
+        # 超过验证间隔时才重新验证所有Cookie，其余时间直接使用缓存的有效索引
+        if self._full_validation_due():
+            self.validate_all_cookies()
+        # 冷却已结束的Cookie重新加入轮换
+        self.check_cooldowns()
+        
+        # 根据不同模式选择，并更新使用记录（选择函数会修改轮询位置、随机序列和least_used堆）
+        with self._state_lock.write():
+            # 在写锁内检查，避免检查后最后一个Cookie被其他线程标记为不可用
+            if not self._alive_count:
+                raise Exception(exhausted_error)
+            index = self.current_index = self._select_next_index()
+            self._states[index]["last_used"] = self._now_iso()
+        if self._listeners:
+            self._emit("rotation", {"index": index, "strategy": self._rotation_strategy})
+        return index
+    
+    def _strategy_table(self) -> Dict[str, Callable[[], int]]:
+        """轮换策略名称到选择函数的映射，子类可以扩展"""
+        return {
+            "round_robin": self._next_round_robin,  # 轮询模式
+            "random": self._next_random,  # 随机模式
+            "least_used": self._least_used_index,  # 最少使用模式
+        }
+    
+    def _bind_strategy(self):
+        """根据当前轮换策略绑定选择函数，未知策略使用轮询模式"""
+        self._pick = self._strategy_table().get(self._rotation_strategy, self._next_round_robin)
+    
+    def _select_next_index(self) -> int:
+        """按轮换策略选择下一个要使用的索引（调用前需确保存在可用索引）"""
+        return self._pick()
+    
+    def _next_random(self) -> int:
+        """按打乱后的索引序列选取下一个可用的索引，序列用完后重新打乱（调用前需确保存在可用索引）"""
+        mask = self._alive_mask
+        count = len(mask)
+        if len(self._shuffle) != count:
+            self._shuffle = list(range(count))
+            self._shuffle_cursor = count
+        
+        # 最多遍历剩余序列和一轮新序列
+        for _ in range(2 * count):
+            if self._shuffle_cursor >= count:
+                self._rng.shuffle(self._shuffle)
+                self._shuffle_cursor = 0
+            index = self._shuffle[self._shuffle_cursor]
+            self._shuffle_cursor += 1
+            if mask[index]:
+                return index
+        
+        return self._rng.choice(self._alive_indices())
+    
+    def _next_round_robin(self) -> int:
+        """从当前索引之后顺序查找下一个可用的索引（调用前需确保存在可用索引）"""
+        mask = self._alive_mask
+        count = len(mask)
+        index = self.current_index
+        for _ in range(count):
+            index += 1
+            if index >= count:
+                index = 0
+            if mask[index]:
+                break
+        return index
+    
+    def get_validation_workers(self) -> int:
+        """获取并发验证的最大线程数"""
+        return self.config.get("validation_workers", 8)
+    
+    def _needs_validation(self, state: Dict[str, Any], now: float) -> bool:
+        """判断Cookie是否需要重新验证（状态未知或上次检查超过验证间隔）
+        
+        旧版状态文件只保存ISO格式的last_checked，首次读取时解析一次并写入last_checked_ts，
+        因此调用方需持有写锁
+        
+        Args:
+            state: Cookie状态
+            now: 本轮检查统一使用的当前时间戳
+        """
+        if state.get("valid") is None:
+            return True
+        last_checked_ts = state.get("last_checked_ts")
+        if last_checked_ts is None:
+            last_checked = state.get("last_checked")
+            if not last_checked:
+                return False
+            last_checked_ts = datetime.fromisoformat(last_checked).timestamp()
+            state["last_checked_ts"] = last_checked_ts
+        return now - last_checked_ts > self.get_validation_interval_hours() * 3600
+    
+    def _validate_indices(self, indices: List[int]) -> Dict[int, bool]:
+        """并发验证多个Cookie
+        
+        验证请求是阻塞的网络IO，使用线程池并发执行，总耗时约为最慢的一次请求
+        
+        Args:
+            indices: 需要验证的Cookie索引
+            
+        Returns:
+            索引到验证结果的映射
+        """
+        if len(indices) <= 1:
+            return {i: self.validate_cookie(i) for i in indices}
+        
+        # 线程池在多次验证间复用，避免每轮验证重复创建和销毁线程，
+        # 工作线程中缓存的会话（如Grok的cloudscraper）也能跨轮次保留
+        if self._validation_executor is None:
+            self._validation_executor = ThreadPoolExecutor(
+                max_workers=max(1, self.get_validation_workers()),
+                thread_name_prefix=f"{type(self).__name__}-validate"
+            )
+        return dict(zip(indices, self._validation_executor.map(self.validate_cookie, indices)))
+    
+    def refresh(self):
+        """立即重新验证所有Cookie（用于手动触发，不等待验证间隔）"""
+        self.validate_all_cookies()
+    
     def should_rotate(self) -> bool:
         """判断是否应该轮换Cookie"""
         interval = self.get_rotation_interval()
@@ -85,6 +788,14 @@ class BaseCookieManager:
             return True
         return False
     
+    def validate_all_cookies(self):
+        """验证所有Cookie并重建可用掩码（需要子类实现）"""
+        raise NotImplementedError("子类必须实现validate_all_cookies方法")
+    
+    def check_cooldowns(self):
+        """将冷却已结束的Cookie重新加入轮换（需要子类实现）"""
+        raise NotImplementedError("子类必须实现check_cooldowns方法")
+    
     def validate_cookie(self, index: int) -> bool:
         """验证Cookie是否有效（需要子类实现）"""
         raise NotImplementedError("子类必须实现validate_cookie方法")
@@ -97,9 +808,76 @@ class BaseCookieManager:
         """增加指定Cookie的请求计数"""
         raise NotImplementedError("子类必须实现increment_request_count方法")
     
+    def _cooldown_duration(self, index: int) -> float:
+        """获取指定Cookie的冷却时长（秒），子类可以按Cookie自身的信息覆盖（调用方持有写锁）"""
+        return self._cooldown_seconds
+    
+    def start_cooldown(self, index: int, now: Optional[float] = None):
+        """开始Cookie冷却
+        
+        Args:
+            index: Cookie索引
+            now: 当前时间戳，未指定时使用当前时间
+        """
+        self.start_cooldown_batch([index], now)
+    
+    def start_cooldown_batch(self, indices: List[int], now: Optional[float] = None):
+        """同时开始多个Cookie的冷却（如多个Cookie同时触发限流）
+        
+        所有Cookie共用同一个当前时间，状态修改在一次写锁内完成，最后只标记一次修改
+        
+        Args:
+            indices: Cookie索引列表
+            now: 当前时间戳，未指定时使用当前时间
+        """
+        if now is None:
+            now = time.time()
+        
+        started = []
+        with self._state_lock.write():
+            for index in indices:
+                if not 0 <= index < len(self._states):
+                    continue
+                state = self._states[index]
+                next_available_ts = now + self._cooldown_duration(index)
+                next_available = datetime.fromtimestamp(next_available_ts)
+                
+                state["is_cooling"] = True
+                state["next_available"] = next_available.isoformat()
+                state["next_available_ts"] = next_available_ts
+                self._push_cooldown(index, next_available_ts)
+                
+                # 标记为不可用
+                self._set_alive(index, False)
+                started.append((index, next_available, next_available_ts))
+        
+        if not started:
+            return
+        for index, next_available, next_available_ts in started:
+            logger.info(f"{self._log_name} {index} 开始冷却，将在 {next_available} 后可用")
+            if self._listeners:
+                self._emit("cooldown_start", {"index": index, "next_available_ts": next_available_ts})
+        self._mark_dirty()
+    
     def get_stats(self) -> Dict:
-        """获取所有Cookie的统计信息"""
-        raise NotImplementedError("子类必须实现get_stats方法")
+        """获取所有Cookie的统计信息
+        
+        状态未修改时直接返回上次生成的结果，调用方不得修改返回的字典
+        
+        Returns:
+            Cookie统计信息
+        """
+        version = self._stats_version
+        cached_version, stats = self._stats_cache
+        if cached_version != version:
+            with self._state_lock.read():
+                stats = self._build_stats()
+            self._stats_cache = (version, stats)
+        return stats
+    
+    def _build_stats(self) -> Dict:
+        """生成统计信息（需要子类实现）"""
+        raise NotImplementedError("子类必须实现_build_stats方法")
     
     def mark_cookie_invalid(self, index: int, reason: str = ""):
         """标记Cookie为无效"""
@@ -120,10 +898,11 @@ class YouCookieManager(BaseCookieManager):
         self.cookies = cookies
         self.chat_mode = "custom"  # 默认为custom模式
         self.mode_rotation_count = 0
+        # 预先生成各Cookie的状态键，避免每次请求时格式化字符串
+        self._cookie_ids = [f"cookie_{i}" for i in range(len(cookies))]
         
         # 初始化Cookie状态
-        for i, cookie in enumerate(cookies):
-            cookie_id = f"cookie_{i}"
+        for cookie_id, cookie in zip(self._cookie_ids, cookies):
             if cookie_id not in self.cookie_states:
                 self.cookie_states[cookie_id] = {
                     "cookie": cookie,
@@ -137,36 +916,39 @@ class YouCookieManager(BaseCookieManager):
                     "next_available": None
                 }
         
-        # 初始化Agent模式ID存储
-        if "agent_modes" not in self.cookie_states:
-            self.cookie_states["agent_modes"] = {}
+        # 初始化Agent模式ID和聊天模式冷却的存储，之后直接访问
+        self.cookie_states.setdefault("agent_modes", {})
+        self.cookie_states.setdefault("mode_cooldowns", {})
+        # 各聊天模式冷却的(截止时间戳, monotonic截止时间)，只在进程内使用，不保存
+        self._mode_deadlines: Dict[str, tuple] = {}
+        
+        self._bind_states()
         
         # 验证所有Cookie
         self.validate_all_cookies()
     
     def validate_all_cookies(self):
         """验证所有Cookie"""
-        self.valid_indices = []
-        for i in range(len(self.cookies)):
-            cookie_id = f"cookie_{i}"
-            state = self.cookie_states.get(cookie_id, {})
+        states = self._states
+        
+        # 如果Cookie状态未知或上次检查超过验证间隔，重新验证（并发执行）
+        now = time.time()
+        with self._state_lock.write():
+            pending = [i for i, state in enumerate(states) if self._needs_validation(state, now)]
+        # 验证线程会获取写锁更新状态，验证期间不持有锁
+        results = self._validate_indices(pending)
+        
+        with self._state_lock.write():
+            self._reset_alive(len(self.cookies))
+            for i, state in enumerate(states):
+                is_valid = results[i] if i in results else state.get("valid", False)
+                if is_valid and not state.get("is_cooling", False):
+                    self._set_alive(i, True)
             
-            # 如果Cookie状态未知或上次检查超过验证间隔，重新验证
-            last_checked = state.get("last_checked")
-            validation_interval = self.get_validation_interval_hours()
-            
-            if state.get("valid") is None or (
-                last_checked and 
-                (datetime.now() - datetime.fromisoformat(last_checked)).total_seconds() > validation_interval * 3600
-            ):
-                is_valid = self.validate_cookie(i)
-            else:
-                is_valid = state.get("valid", False)
-            
-            if is_valid and not state.get("is_cooling", False):
-                self.valid_indices.append(i)
-        
-        logger.info(f"You.com: 有效Cookie数量: {len(self.valid_indices)}/{len(self.cookies)}")
+            self._rebuild_usage_heap()
+            self._rebuild_cooldown_heap(states)
+        self._last_full_validation_ts = time.monotonic()
+        logger.info(f"You.com: 有效Cookie数量: {self._alive_count}/{len(self.cookies)}")
     
     def validate_cookie(self, index: int) -> bool:
         """验证Cookie是否有效
@@ -177,19 +959,16 @@ class YouCookieManager(BaseCookieManager):
         Returns:
             Cookie是否有效
         """
-        import requests
-        
-        cookie_id = f"cookie_{index}"
         cookie = self.cookies[index]
         
         headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            **self._base_headers,
             "Cookie": cookie
         }
         
         try:
             # 尝试获取用户数据来验证Cookie
-            response = requests.get(
+            response = self._http.get(
                 headers=headers,
                 url='https://you.com/_next/data/ee50cd42bdfa0bd3ad044daa2349a6179381d5ef/en-US/search.json'
             )
@@ -207,19 +986,24 @@ class YouCookieManager(BaseCookieManager):
                 self._update_cookie_state(index, False)
                 return False
             
-            # 尝试解析响应
-            data = response.json()
-            
-            # 提取邮箱和订阅信息
-            launch_darkly_context = data.get("pageProps", {}).get("launchDarklyContext", {})
-            email = launch_darkly_context.get("email", "UNKNOWN")
-            
-            you_pro_state = data.get("pageProps", {}).get("youProState", {})
-            subscription_tier = "free"
-            if you_pro_state:
-                subscriptions = you_pro_state.get("subscriptions", [])
-                if subscriptions:
-                    subscription_tier = subscriptions[0].get("tier", "free")
+            # 响应是完整的Next.js页面数据，优先用正则直接提取所需字段
+            account = _extract_you_account(response.content)
+            if account is not None:
+                email, subscription_tier = account
+            else:
+                # 正则无法定位时回退到完整解析
+                data = response.json()
+                
+                # 提取邮箱和订阅信息
+                launch_darkly_context = data.get("pageProps", {}).get("launchDarklyContext", {})
+                email = launch_darkly_context.get("email", "UNKNOWN")
+                
+                you_pro_state = data.get("pageProps", {}).get("youProState", {})
+                subscription_tier = "free"
+                if you_pro_state:
+                    subscriptions = you_pro_state.get("subscriptions", [])
+                    if subscriptions:
+                        subscription_tier = subscriptions[0].get("tier", "free")
             
             # 更新Cookie状态
             self._update_cookie_state(index, True, email, subscription_tier)
@@ -235,19 +1019,21 @@ class YouCookieManager(BaseCookieManager):
     def _update_cookie_state(self, index: int, is_valid: bool, email: str = "UNKNOWN", 
                             subscription_tier: str = "UNKNOWN", error: str = ""):
         """更新Cookie状态"""
-        cookie_id = f"cookie_{index}"
-        
-        self.cookie_states[cookie_id].update({
-            "valid": is_valid,
-            "last_checked": datetime.now().isoformat(),
-            "email": email if is_valid else self.cookie_states[cookie_id].get("email", "UNKNOWN"),
-            "subscription_tier": subscription_tier if is_valid else self.cookie_states[cookie_id].get("subscription_tier", "UNKNOWN"),
-        })
-        
-        if error:
-            self.cookie_states[cookie_id]["error"] = error
+        state = self._states[index]
+        
+        with self._state_lock.write():
+            state.update({
+                "valid": is_valid,
+                "last_checked": self._now_iso(),
+                "last_checked_ts": time.time(),
+                "email": email if is_valid else state.get("email", "UNKNOWN"),
+                "subscription_tier": subscription_tier if is_valid else state.get("subscription_tier", "UNKNOWN"),
+            })
+            
+            if error:
+                state["error"] = error
         
-        self._save_state()
+        self._mark_dirty()
     
     def get_next_cookie(self) -> str:
         """获取下一个要使用的Cookie
@@ -261,47 +1047,8 @@ class YouCookieManager(BaseCookieManager):
         if not self.cookies:
             raise Exception("没有可用的You.com Cookie")
         
-        # 验证所有Cookie
-        self.validate_all_cookies()
-        
-        if not self.valid_indices:
-            raise Exception("所有You.com Cookie都已失效")
-        
-        # 根据不同模式选择Cookie
-        rotation_strategy = self.get_rotation_strategy()
-        
-        if rotation_strategy == "round_robin":
-            # 轮询模式
-            if self.current_index in self.valid_indices:
-                current_position = self.valid_indices.index(self.current_index)
-                next_position = (current_position + 1) % len(self.valid_indices)
-                self.current_index = self.valid_indices[next_position]
-            else:
-                self.current_index = self.valid_indices[0]
-        elif rotation_strategy == "random":
-            # 随机模式
-            self.current_index = random.choice(self.valid_indices)
-        elif rotation_strategy == "least_used":
-            # 最少使用模式
-            self.current_index = min(
-                self.valid_indices, 
-                key=lambda i: self.cookie_states.get(f"cookie_{i}", {}).get("request_count", 0)
-            )
-        else:
-            # 默认轮询
-            if self.current_index in self.valid_indices:
-                current_position = self.valid_indices.index(self.current_index)
-                next_position = (current_position + 1) % len(self.valid_indices)
-                self.current_index = self.valid_indices[next_position]
-            else:
-                self.current_index = self.valid_indices[0]
-        
-        # 更新使用记录
-        cookie_id = f"cookie_{self.current_index}"
-        self.cookie_states[cookie_id]["last_used"] = datetime.now().isoformat()
-        
-        # 保存状态
-        self._save_state()
+        self._pick_next_index("所有You.com Cookie都已失效")
+        self._mark_dirty()
         
         # 检查是否需要轮换聊天模式（仅针对You.com）
         self.update_chat_mode()
@@ -331,10 +1078,8 @@ class YouCookieManager(BaseCookieManager):
             index: Cookie索引
         """
         if 0 <= index < len(self.cookies):
-            cookie_id = f"cookie_{index}"
-            if cookie_id in self.cookie_states:
-                self.cookie_states[cookie_id]["request_count"] = self.cookie_states[cookie_id].get("request_count", 0) + 1
-                self._save_state()
+            self._record_usage(index)
+            self._mark_dirty()
     
     def mark_cookie_invalid(self, index: int, reason: str = ""):
         """标记Cookie为无效
@@ -344,61 +1089,40 @@ class YouCookieManager(BaseCookieManager):
             reason: 无效原因
         """
         if 0 <= index < len(self.cookies):
-            cookie_id = f"cookie_{index}"
-            if cookie_id in self.cookie_states:
-                self.cookie_states[cookie_id]["valid"] = False
-                self.cookie_states[cookie_id]["error"] = reason
-                self.cookie_states[cookie_id]["invalidated_at"] = datetime.now().isoformat()
-                
-                # 从有效索引列表中移除
-                if index in self.valid_indices:
-                    self.valid_indices.remove(index)
-                
-                logger.warning(f"已标记Cookie {index} 为无效: {reason}")
-                self._save_state()
-    
-    def start_cooldown(self, index: int):
-        """开始Cookie冷却
-        
-        Args:
-            index: Cookie索引
-        """
-        if 0 <= index < len(self.cookies):
-            cookie_id = f"cookie_{index}"
-            if cookie_id in self.cookie_states:
-                cooldown_minutes = self.get_cooldown_minutes()
-                next_available = datetime.now() + timedelta(minutes=cooldown_minutes)
-                
-                self.cookie_states[cookie_id]["is_cooling"] = True
-                self.cookie_states[cookie_id]["next_available"] = next_available.isoformat()
-                
-                # 从有效索引列表中移除
-                if index in self.valid_indices:
-                    self.valid_indices.remove(index)
+            state = self._states[index]
+            with self._state_lock.write():
+                state["valid"] = False
+                state["error"] = reason
+                state["invalidated_at"] = self._now_iso()
                 
-                logger.info(f"Cookie {index} 开始冷却，将在 {next_available} 后可用")
-                self._save_state()
+                # 标记为不可用
+                self._set_alive(index, False)
+            
+            logger.warning(f"已标记Cookie {index} 为无效: {reason}")
+            if self._listeners:
+                self._emit("invalid", {"index": index, "reason": reason})
+            self._mark_dirty()
     
     def check_cooldowns(self):
         """检查所有Cookie的冷却状态"""
-        for i in range(len(self.cookies)):
-            cookie_id = f"cookie_{i}"
-            state = self.cookie_states.get(cookie_id, {})
+        # 只处理冷却截止时间已过的Cookie
+        for i in self._pop_expired_cooldowns():
+            state = self._states[i]
             
-            if state.get("is_cooling", False) and state.get("next_available"):
-                next_available = datetime.fromisoformat(state["next_available"])
+            # 冷却结束
+            with self._state_lock.write():
+                state["is_cooling"] = False
+                state["next_available"] = None
+                state["next_available_ts"] = None
                 
-                if datetime.now() >= next_available:
-                    # 冷却结束
-                    self.cookie_states[cookie_id]["is_cooling"] = False
-                    self.cookie_states[cookie_id]["next_available"] = None
-                    
-                    # 如果Cookie有效，添加回有效索引列表
-                    if state.get("valid", False) and i not in self.valid_indices:
-                        self.valid_indices.append(i)
-                    
-                    logger.info(f"Cookie {i} 冷却结束，现在可用")
-                    self._save_state()
+                # 如果Cookie有效，重新标记为可用
+                if state.get("valid", False):
+                    self._set_alive(i, True)
+            
+            logger.info(f"Cookie {i} 冷却结束，现在可用")
+            if self._listeners:
+                self._emit("cooldown_end", {"index": i})
+            self._mark_dirty()
 
     def get_agent_mode(self, model_name: str) -> str:
         """获取指定模型的Agent模式ID
@@ -409,7 +1133,7 @@ class YouCookieManager(BaseCookieManager):
         Returns:
             Agent模式ID，如果不存在则返回空字符串
         """
-        agent_modes = self.cookie_states.get("agent_modes", {})
+        agent_modes = self.cookie_states["agent_modes"]
         
         # 检查模型是否有有效的agent模式
         if model_name in agent_modes and agent_modes[model_name].get("valid", True):
@@ -424,17 +1148,15 @@ class YouCookieManager(BaseCookieManager):
             model_name: 模型名称
             agent_id: Agent模式ID
         """
-        if "agent_modes" not in self.cookie_states:
-            self.cookie_states["agent_modes"] = {}
-        
-        self.cookie_states["agent_modes"][model_name] = {
-            "agent_id": agent_id,
-            "created_at": datetime.now().isoformat(),
-            "valid": True
-        }
+        with self._state_lock.write():
+            self.cookie_states["agent_modes"][model_name] = {
+                "agent_id": agent_id,
+                "created_at": self._now_iso(),
+                "valid": True
+            }
         
         logger.info(f"已为模型 {model_name} 添加Agent模式ID: {agent_id}")
-        self._save_state()
+        self._mark_dirty()
 
     def mark_agent_mode_invalid(self, model_name: str, reason: str = ""):
         """标记模型的Agent模式为无效
@@ -443,13 +1165,15 @@ class YouCookieManager(BaseCookieManager):
             model_name: 模型名称
             reason: 无效原因
         """
-        if "agent_modes" in self.cookie_states and model_name in self.cookie_states["agent_modes"]:
-            self.cookie_states["agent_modes"][model_name]["valid"] = False
-            self.cookie_states["agent_modes"][model_name]["error"] = reason
-            self.cookie_states["agent_modes"][model_name]["invalidated_at"] = datetime.now().isoformat()
+        agent_mode = self.cookie_states["agent_modes"].get(model_name)
+        if agent_mode is not None:
+            with self._state_lock.write():
+                agent_mode["valid"] = False
+                agent_mode["error"] = reason
+                agent_mode["invalidated_at"] = self._now_iso()
             
             logger.warning(f"已标记模型 {model_name} 的Agent模式为无效: {reason}")
-            self._save_state()
+            self._mark_dirty()
 
     def start_mode_cooldown(self, mode: str):
         """开始特定聊天模式的冷却
@@ -457,21 +1181,20 @@ class YouCookieManager(BaseCookieManager):
         Args:
             mode: 要冷却的聊天模式（custom或agent模式ID）
         """
-        # 存储冷却中的模式
-        if "mode_cooldowns" not in self.cookie_states:
-            self.cookie_states["mode_cooldowns"] = {}
-        
-        cooldown_minutes = self.get_cooldown_minutes()
-        next_available = datetime.now() + timedelta(minutes=cooldown_minutes)
-        
-        self.cookie_states["mode_cooldowns"][mode] = {
-            "is_cooling": True,
-            "next_available": next_available.isoformat(),
-            "started_at": datetime.now().isoformat()
-        }
+        next_available_ts = time.time() + self._cooldown_seconds
+        next_available = datetime.fromtimestamp(next_available_ts)
+        
+        with self._state_lock.write():
+            self._mode_deadlines[mode] = (next_available_ts, time.monotonic() + self._cooldown_seconds)
+            self.cookie_states["mode_cooldowns"][mode] = {
+                "is_cooling": True,
+                "next_available": next_available.isoformat(),
+                "next_available_ts": next_available_ts,
+                "started_at": self._now_iso()
+            }
         
         logger.info(f"聊天模式 {mode} 开始冷却，将在 {next_available} 后可用")
-        self._save_state()
+        self._mark_dirty()
 
     def is_mode_in_cooldown(self, mode: str) -> bool:
         """检查特定聊天模式是否在冷却中
@@ -482,73 +1205,46 @@ class YouCookieManager(BaseCookieManager):
         Returns:
             模式是否在冷却中
         """
-        if "mode_cooldowns" not in self.cookie_states:
-            return False
-        
         mode_cooldown = self.cookie_states["mode_cooldowns"].get(mode, {})
         if not mode_cooldown.get("is_cooling", False):
             return False
         
-        # 检查冷却是否已过期
-        next_available = mode_cooldown.get("next_available")
-        if next_available:
-            if datetime.now() >= datetime.fromisoformat(next_available):
+        # 检查冷却是否已过期（与Cookie冷却相同，进程内按monotonic时间比较）
+        # 已换算过截止时间且尚未到期时只需读锁
+        with self._state_lock.read():
+            mode_cooldown = self.cookie_states["mode_cooldowns"].get(mode, {})
+            cached = self._mode_deadlines.get(mode)
+            if (cached is not None and mode_cooldown.get("is_cooling", False)
+                    and cached[0] == mode_cooldown.get("next_available_ts")
+                    and time.monotonic() < cached[1]):
+                return True
+        
+        # 需要迁移旧格式、换算截止时间或清除已结束的冷却时获取写锁
+        with self._state_lock.write():
+            # 等待写锁期间冷却可能已被其他线程清除或重新开始，重新读取
+            mode_cooldown = self.cookie_states["mode_cooldowns"].get(mode, {})
+            if not mode_cooldown.get("is_cooling", False):
+                return False
+            deadline = self._cooldown_deadline(mode_cooldown)
+            expired = False
+            if deadline is not None:
+                cached = self._mode_deadlines.get(mode)
+                if cached is None or cached[0] != deadline:
+                    # 从状态文件加载的冷却，换算一次monotonic截止时间
+                    cached = (deadline, time.monotonic() + (deadline - time.time()))
+                    self._mode_deadlines[mode] = cached
+                expired = time.monotonic() >= cached[1]
+            if expired:
                 # 冷却已结束
                 mode_cooldown["is_cooling"] = False
                 mode_cooldown["next_available"] = None
-                self._save_state()
-                return False
-        
-        return True
-        
-    def start_mode_cooldown(self, mode: str):
-        """开始特定聊天模式的冷却
-        
-        Args:
-            mode: 要冷却的聊天模式（custom或agent模式ID）
-        """
-        # 存储冷却中的模式
-        if "mode_cooldowns" not in self.cookie_states:
-            self.cookie_states["mode_cooldowns"] = {}
-        
-        cooldown_minutes = self.get_cooldown_minutes()
-        next_available = datetime.now() + timedelta(minutes=cooldown_minutes)
-        
-        self.cookie_states["mode_cooldowns"][mode] = {
-            "is_cooling": True,
-            "next_available": next_available.isoformat(),
-            "started_at": datetime.now().isoformat()
-        }
-        
-        logger.info(f"聊天模式 {mode} 开始冷却，将在 {next_available} 后可用")
-        self._save_state()
-
-    def is_mode_in_cooldown(self, mode: str) -> bool:
-        """检查特定聊天模式是否在冷却中
-        
-        Args:
-            mode: 要检查的聊天模式
-            
-        Returns:
-            模式是否在冷却中
-        """
-        if "mode_cooldowns" not in self.cookie_states:
-            return False
+                mode_cooldown["next_available_ts"] = None
+                del self._mode_deadlines[mode]
         
-        mode_cooldown = self.cookie_states["mode_cooldowns"].get(mode, {})
-        if not mode_cooldown.get("is_cooling", False):
+        if expired:
+            self._mark_dirty()
             return False
         
-        # 检查冷却是否已过期
-        next_available = mode_cooldown.get("next_available")
-        if next_available:
-            if datetime.now() >= datetime.fromisoformat(next_available):
-                # 冷却已结束
-                mode_cooldown["is_cooling"] = False
-                mode_cooldown["next_available"] = None
-                self._save_state()
-                return False
-        
         return True
 
 
@@ -628,14 +1324,12 @@ class YouCookieManager(BaseCookieManager):
         logger.info(f"正在为模型 {model_name} 创建Agent模式...")
         
         try:
-            import requests
-            
             # 获取当前Cookie
             cookie = self.cookies[self.current_index]
             
             # 准备请求
             headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+                **self._base_headers,
                 "Cookie": cookie,
                 "Content-Type": "application/json"
             }
@@ -659,7 +1353,7 @@ class YouCookieManager(BaseCookieManager):
             }
             
             # 发送请求
-            response = requests.post(
+            response = self._http.post(
                 "https://you.com/api/custom_assistants/assistants",
                 headers=headers,
                 json=payload
@@ -697,10 +1391,13 @@ class XCredentialManager(BaseCookieManager):
         """
         super().__init__(config, state_file="logs/x_credential_state.json")
         self.credentials = credentials
+        # 预先生成各凭证的状态键，避免每次请求时格式化字符串
+        self._cookie_ids = [f"credential_{i}" for i in range(len(credentials))]
+        self._log_name = "X.ai凭证"
+        self._previews = [_preview(cred.get("cookie", "")) for cred in credentials]
         
         # 初始化凭证状态
-        for i, cred in enumerate(credentials):
-            cred_id = f"credential_{i}"
+        for cred_id, cred in zip(self._cookie_ids, credentials):
             if cred_id not in self.cookie_states:
                 self.cookie_states[cred_id] = {
                     "credential": cred,
@@ -713,6 +1410,8 @@ class XCredentialManager(BaseCookieManager):
                     "next_available": None
                 }
         
+        self._bind_states()
+        
         # 验证所有凭证
         self.validate_all_cookies()
     def __iter__(self):
@@ -723,27 +1422,26 @@ class XCredentialManager(BaseCookieManager):
         return len(self.credentials)
     def validate_all_cookies(self):
         """验证所有凭证"""
-        self.valid_indices = []
-        for i in range(len(self.credentials)):
-            cred_id = f"credential_{i}"
-            state = self.cookie_states.get(cred_id, {})
-            
-            # 如果凭证状态未知或上次检查超过验证间隔，重新验证
-            last_checked = state.get("last_checked")
-            validation_interval = self.get_validation_interval_hours()
-            
-            if state.get("valid") is None or (
-                last_checked and 
-                (datetime.now() - datetime.fromisoformat(last_checked)).total_seconds() > validation_interval * 3600
-            ):
-                is_valid = self.validate_cookie(i)
-            else:
-                is_valid = state.get("valid", False)
+        states = self._states
+        
+        # 如果凭证状态未知或上次检查超过验证间隔，重新验证（并发执行）
+        now = time.time()
+        with self._state_lock.write():
+            pending = [i for i, state in enumerate(states) if self._needs_validation(state, now)]
+        # 验证线程会获取写锁更新状态，验证期间不持有锁
+        results = self._validate_indices(pending)
+        
+        with self._state_lock.write():
+            self._reset_alive(len(self.credentials))
+            for i, state in enumerate(states):
+                is_valid = results[i] if i in results else state.get("valid", False)
+                if is_valid and not state.get("is_cooling", False):
+                    self._set_alive(i, True)
             
-            if is_valid and not state.get("is_cooling", False):
-                self.valid_indices.append(i)
-        
-        logger.info(f"X.ai: 有效凭证数量: {len(self.valid_indices)}/{len(self.credentials)}")
+            self._rebuild_usage_heap()
+            self._rebuild_cooldown_heap(states)
+        self._last_full_validation_ts = time.monotonic()
+        logger.info(f"X.ai: 有效凭证数量: {self._alive_count}/{len(self.credentials)}")
     
     def validate_cookie(self, index: int) -> bool:
         """验证凭证是否有效
@@ -754,13 +1452,10 @@ class XCredentialManager(BaseCookieManager):
         Returns:
             凭证是否有效
         """
-        import requests
-        
-        cred_id = f"credential_{index}"
         cred = self.credentials[index]
         
         headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            **self._base_headers,
             "Cookie": cred.get("cookie", ""),
             "Authorization": cred.get("authorization", ""),
             "x-csrf-token": cred.get("x-csrf-token", "")
@@ -768,7 +1463,7 @@ class XCredentialManager(BaseCookieManager):
         
         try:
             # 尝试获取用户数据来验证凭证
-            response = requests.post(
+            response = self._http.post(
                 headers=headers,
                 url='https://x.com/i/api/graphql/vvC5uy7pWWHXS2aDi1FZeA/CreateGrokConversation',
                 json={
@@ -783,10 +1478,9 @@ class XCredentialManager(BaseCookieManager):
                 self._update_credential_state(index, False)
                 return False
             
-            # 尝试解析响应
-            data = response.json()
-            
-            # 提取用户名
+            # 响应必须是合法的JSON，否则抛出异常视为验证失败（安装了orjson时用其解析）
+            # 响应中没有账号本身的用户信息，用户名保持UNKNOWN
+            _loads(response.content)
             username = "UNKNOWN"
             
             # 更新凭证状态
@@ -802,18 +1496,20 @@ class XCredentialManager(BaseCookieManager):
     
     def _update_credential_state(self, index: int, is_valid: bool, username: str = "UNKNOWN", error: str = ""):
         """更新凭证状态"""
-        cred_id = f"credential_{index}"
-        
-        self.cookie_states[cred_id].update({
-            "valid": is_valid,
-            "last_checked": datetime.now().isoformat(),
-            "username": username if is_valid else self.cookie_states[cred_id].get("username", "UNKNOWN")
-        })
-        
-        if error:
-            self.cookie_states[cred_id]["error"] = error
+        state = self._states[index]
+        
+        with self._state_lock.write():
+            state.update({
+                "valid": is_valid,
+                "last_checked": self._now_iso(),
+                "last_checked_ts": time.time(),
+                "username": username if is_valid else state.get("username", "UNKNOWN")
+            })
+            
+            if error:
+                state["error"] = error
         
-        self._save_state()
+        self._mark_dirty()
     
     def get_next_cookie(self) -> Dict[str, str]:
         """获取下一个要使用的凭证
@@ -827,47 +1523,8 @@ class XCredentialManager(BaseCookieManager):
         if not self.credentials:
             raise Exception("没有可用的X.ai凭证")
         
-        # 验证所有凭证
-        self.validate_all_cookies()
-        
-        if not self.valid_indices:
-            raise Exception("所有X.ai凭证都已失效")
-        
-        # 根据不同模式选择凭证
-        rotation_strategy = self.get_rotation_strategy()
-        
-        if rotation_strategy == "round_robin":
-            # 轮询模式
-            if self.current_index in self.valid_indices:
-                current_position = self.valid_indices.index(self.current_index)
-                next_position = (current_position + 1) % len(self.valid_indices)
-                self.current_index = self.valid_indices[next_position]
-            else:
-                self.current_index = self.valid_indices[0]
-        elif rotation_strategy == "random":
-            # 随机模式
-            self.current_index = random.choice(self.valid_indices)
-        elif rotation_strategy == "least_used":
-            # 最少使用模式
-            self.current_index = min(
-                self.valid_indices, 
-                key=lambda i: self.cookie_states.get(f"credential_{i}", {}).get("request_count", 0)
-            )
-        else:
-            # 默认轮询
-            if self.current_index in self.valid_indices:
-                current_position = self.valid_indices.index(self.current_index)
-                next_position = (current_position + 1) % len(self.valid_indices)
-                self.current_index = self.valid_indices[next_position]
-            else:
-                self.current_index = self.valid_indices[0]
-        
-        # 更新使用记录
-        cred_id = f"credential_{self.current_index}"
-        self.cookie_states[cred_id]["last_used"] = datetime.now().isoformat()
-        
-        # 保存状态
-        self._save_state()
+        self._pick_next_index("所有X.ai凭证都已失效")
+        self._mark_dirty()
         
         return self.credentials[self.current_index]
     
@@ -878,10 +1535,8 @@ class XCredentialManager(BaseCookieManager):
             index: 凭证索引
         """
         if 0 <= index < len(self.credentials):
-            cred_id = f"credential_{index}"
-            if cred_id in self.cookie_states:
-                self.cookie_states[cred_id]["request_count"] = self.cookie_states[cred_id].get("request_count", 0) + 1
-                self._save_state()
+            self._record_usage(index)
+            self._mark_dirty()
     
     def mark_cookie_invalid(self, index: int, reason: str = ""):
         """标记凭证为无效
@@ -891,65 +1546,41 @@ class XCredentialManager(BaseCookieManager):
             reason: 无效原因
         """
         if 0 <= index < len(self.credentials):
-            cred_id = f"credential_{index}"
-            if cred_id in self.cookie_states:
-                self.cookie_states[cred_id]["valid"] = False
-                self.cookie_states[cred_id]["error"] = reason
-                self.cookie_states[cred_id]["invalidated_at"] = datetime.now().isoformat()
-                
-                # 从有效索引列表中移除
-                if index in self.valid_indices:
-                    self.valid_indices.remove(index)
+            state = self._states[index]
+            with self._state_lock.write():
+                state["valid"] = False
+                state["error"] = reason
+                state["invalidated_at"] = self._now_iso()
                 
-                logger.warning(f"已标记X.ai凭证 {index} 为无效: {reason}")
-                self._save_state()
-    
-    def start_cooldown(self, index: int):
-        """开始凭证冷却
-        
-        Args:
-            index: 凭证索引
-        """
-        if 0 <= index < len(self.credentials):
-            cred_id = f"credential_{index}"
-            if cred_id in self.cookie_states:
-                cooldown_minutes = self.get_cooldown_minutes()
-                next_available = datetime.now() + timedelta(minutes=cooldown_minutes)
-                
-                self.cookie_states[cred_id]["is_cooling"] = True
-                self.cookie_states[cred_id]["next_available"] = next_available.isoformat()
-                
-                # 从有效索引列表中移除
-                if index in self.valid_indices:
-                    self.valid_indices.remove(index)
-                
-                logger.info(f"X.ai凭证 {index} 开始冷却，将在 {next_available} 后可用")
-                self._save_state()
+                # 标记为不可用
+                self._set_alive(index, False)
+            
+            logger.warning(f"已标记X.ai凭证 {index} 为无效: {reason}")
+            if self._listeners:
+                self._emit("invalid", {"index": index, "reason": reason})
+            self._mark_dirty()
     
-    def get_stats(self) -> Dict:
-        """获取所有凭证的统计信息
+    def _build_stats(self) -> Dict:
+        """生成所有凭证的统计信息
         
         Returns:
             凭证统计信息
         """
         stats = {
             "total_credentials": len(self.credentials),
-            "valid_credentials": len(self.valid_indices),
+            "valid_credentials": self._alive_count,
             "current_index": self.current_index,
             "credentials": []
         }
         
-        for i, cred in enumerate(self.credentials):
-            cred_id = f"credential_{i}"
-            state = self.cookie_states.get(cred_id, {})
-            cookie_preview = cred.get("cookie", "")[:20] + "..." if len(cred.get("cookie", "")) > 20 else cred.get("cookie", "")
+        for i, state in enumerate(self._states):
             
             stats["credentials"].append({
                 "index": i,
-                "preview": cookie_preview,
+                "preview": self._previews[i],
                 "valid": state.get("valid", False),
                 "username": state.get("username", "UNKNOWN"),
-                "request_count": state.get("request_count", 0),
+                "request_count": self.request_counts[i],
                 "last_used": state.get("last_used"),
                 "last_checked": state.get("last_checked"),
                 "is_cooling": state.get("is_cooling", False),
@@ -960,24 +1591,24 @@ class XCredentialManager(BaseCookieManager):
     
     def check_cooldowns(self):
         """检查所有凭证的冷却状态"""
-        for i in range(len(self.credentials)):
-            cred_id = f"credential_{i}"
-            state = self.cookie_states.get(cred_id, {})
+        # 只处理冷却截止时间已过的凭证
+        for i in self._pop_expired_cooldowns():
+            state = self._states[i]
             
-            if state.get("is_cooling", False) and state.get("next_available"):
-                next_available = datetime.fromisoformat(state["next_available"])
+            # 冷却结束
+            with self._state_lock.write():
+                state["is_cooling"] = False
+                state["next_available"] = None
+                state["next_available_ts"] = None
                 
-                if datetime.now() >= next_available:
-                    # 冷却结束
-                    self.cookie_states[cred_id]["is_cooling"] = False
-                    self.cookie_states[cred_id]["next_available"] = None
-                    
-                    # 如果凭证有效，添加回有效索引列表
-                    if state.get("valid", False) and i not in self.valid_indices:
-                        self.valid_indices.append(i)
-                    
-                    logger.info(f"X.ai凭证 {i} 冷却结束，现在可用")
-                    self._save_state()
+                # 如果凭证有效，重新标记为可用
+                if state.get("valid", False):
+                    self._set_alive(i, True)
+            
+            logger.info(f"X.ai凭证 {i} 冷却结束，现在可用")
+            if self._listeners:
+                self._emit("cooldown_end", {"index": i})
+            self._mark_dirty()
 
 
 class GrokCookieManager(BaseCookieManager):
@@ -995,10 +1626,16 @@ class GrokCookieManager(BaseCookieManager):
         self.base_url = 'https://grok.com'  # 与 GrokReverser 使用相同的基础URL
         self.cf_challenge_count = 0  # 记录CloudFlare挑战次数
         self.last_cf_challenge = None  # 最后一次CloudFlare挑战时间
+        # 每个验证线程复用自己的cloudscraper会话以复用连接
+        # 验证请求显式设置Cookie请求头并在请求前清空会话Cookie，CloudFlare挑战结果不会跨请求保留
+        self._scraper_local = threading.local()
+        # 预先生成各Cookie的状态键，避免每次请求时格式化字符串
+        self._cookie_ids = [f"cookie_{i}" for i in range(len(cookies))]
+        self._log_name = "Grok.com Cookie"
+        self._previews = [_preview(cookie) for cookie in cookies]
         
         # 初始化Cookie状态
-        for i, cookie in enumerate(cookies):
-            cookie_id = f"cookie_{i}"
+        for cookie_id, cookie in zip(self._cookie_ids, cookies):
             if cookie_id not in self.cookie_states:
                 self.cookie_states[cookie_id] = {
                     "cookie": cookie,
@@ -1014,32 +1651,33 @@ class GrokCookieManager(BaseCookieManager):
                     "window_size": None
                 }
         
+        self._bind_states()
+        
         # 验证所有Cookie
         self.validate_all_cookies()
     
     def validate_all_cookies(self):
         """验证所有Cookie"""
-        self.valid_indices = []
-        for i in range(len(self.cookies)):
-            cookie_id = f"cookie_{i}"
-            state = self.cookie_states.get(cookie_id, {})
-            
-            # 如果Cookie状态未知或上次检查超过验证间隔，重新验证
-            last_checked = state.get("last_checked")
-            validation_interval = self.get_validation_interval_hours()
-            
-            if state.get("valid") is None or (
-                last_checked and 
-                (datetime.now() - datetime.fromisoformat(last_checked)).total_seconds() > validation_interval * 3600
-            ):
-                is_valid = self.validate_cookie(i)
-            else:
-                is_valid = state.get("valid", False)
+        states = self._states
+        
+        # 如果Cookie状态未知或上次检查超过验证间隔，重新验证（并发执行）
+        now = time.time()
+        with self._state_lock.write():
+            pending = [i for i, state in enumerate(states) if self._needs_validation(state, now)]
+        # 验证线程会获取写锁更新状态，验证期间不持有锁
+        results = self._validate_indices(pending)
+        
+        with self._state_lock.write():
+            self._reset_alive(len(self.cookies))
+            for i, state in enumerate(states):
+                is_valid = results[i] if i in results else state.get("valid", False)
+                if is_valid and not state.get("is_cooling", False):
+                    self._set_alive(i, True)
             
-            if is_valid and not state.get("is_cooling", False):
-                self.valid_indices.append(i)
-        
-        logger.info(f"Grok.com: 有效Cookie数量: {len(self.valid_indices)}/{len(self.cookies)}")
+            self._rebuild_usage_heap()
+            self._rebuild_cooldown_heap(states)
+        self._last_full_validation_ts = time.monotonic()
+        logger.info(f"Grok.com: 有效Cookie数量: {self._alive_count}/{len(self.cookies)}")
     
     def validate_cookie(self, index: int) -> bool:
         """验证Cookie是否有效
@@ -1050,13 +1688,10 @@ class GrokCookieManager(BaseCookieManager):
         Returns:
             Cookie是否有效
         """
-        import cloudscraper
-        
-        cookie_id = f"cookie_{index}"
         cookie = self.cookies[index]
         
         headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            **self._base_headers,
             "Accept": "application/json, text/plain, */*",
             "Accept-Language": "en-US,en;q=0.9",
             "Cookie": cookie
@@ -1073,26 +1708,21 @@ class GrokCookieManager(BaseCookieManager):
         
         while retry_count <= max_retries:
             try:
-                # 创建cloudscraper实例来绕过CloudFlare保护
-                scraper = cloudscraper.create_scraper(
-                    browser={
-                        'browser': 'chrome',
-                        'platform': 'windows',
-                        'mobile': False
-                    },
-                    interpreter='js2py',
-                    delay=0.5 + (retry_count * 0.5)
-                )
-                scraper.headers.update(headers)
+                # 遇到CloudFlare挑战重试时换用新的会话并加长延迟
+                scraper = self._get_scraper(retry_count)
+                # 会话被多个Cookie复用，清除上一次响应设置的Cookie（包括cf_clearance），只使用本次的Cookie请求头
+                scraper.cookies.clear()
                 
                 # 使用与GrokReverser相同的验证端点和方法
                 response = scraper.post(
                     f"{self.base_url}/rest/rate-limits",
-                    json=validation_body
+                    json=validation_body,
+                    headers=headers,
+                    timeout=_GROK_VALIDATION_TIMEOUT
                 )
                 
                 if response.status_code == 200:
-                    data = response.json()
+                    data = _loads(response.content)
                     if all(k in data for k in ["windowSizeSeconds", "remainingQueries", "totalQueries"]):
                         # 确保所有值都是整数类型
                         remaining_queries = int(data["remainingQueries"]) if data["remainingQueries"] is not None else 0
@@ -1116,8 +1746,9 @@ class GrokCookieManager(BaseCookieManager):
                     # 检查是否是CF盾的问题
                     if "cloudflare" in response.text.lower():
                         logger.warning(f"Grok.com Cookie验证挑战: CloudFlare检测 (尝试 {retry_count+1}/{max_retries})")
-                        self.cf_challenge_count += 1
-                        self.last_cf_challenge = datetime.now()
+                        with self._state_lock.write():
+                            self.cf_challenge_count += 1
+                            self.last_cf_challenge = datetime.now()
                         retry_count += 1
                         if retry_count <= max_retries:
                             continue
@@ -1140,8 +1771,9 @@ class GrokCookieManager(BaseCookieManager):
                 # 检查是否与CloudFlare相关的错误
                 if "cloudflare" in error_msg.lower():
                     logger.warning(f"Grok.com Cookie验证CloudFlare错误 (尝试 {retry_count+1}/{max_retries}): {error_msg}")
-                    self.cf_challenge_count += 1
-                    self.last_cf_challenge = datetime.now()
+                    with self._state_lock.write():
+                        self.cf_challenge_count += 1
+                        self.last_cf_challenge = datetime.now()
                     retry_count += 1
                     if retry_count <= max_retries:
                         continue
@@ -1156,16 +1788,43 @@ class GrokCookieManager(BaseCookieManager):
         # 默认情况（不应该到达这里）
         return False
     
+    def _get_scraper(self, retry_count: int = 0):
+        """获取当前线程的cloudscraper会话
+        
+        Args:
+            retry_count: 重试次数，大于0时重新创建会话以重新处理CloudFlare挑战
+            
+        Returns:
+            cloudscraper会话
+        """
+        import cloudscraper
+        
+        scraper = getattr(self._scraper_local, "scraper", None)
+        if scraper is None or retry_count > 0:
+            # 创建cloudscraper实例来绕过CloudFlare保护
+            scraper = cloudscraper.create_scraper(
+                browser={
+                    'browser': 'chrome',
+                    'platform': 'windows',
+                    'mobile': False
+                },
+                interpreter='js2py',
+                delay=0.5 + (retry_count * 0.5)
+            )
+            self._scraper_local.scraper = scraper
+        return scraper
+    
     def _update_cookie_state(self, index: int, is_valid: bool, username: str = "UNKNOWN", 
                             error: str = "", remaining_queries: int = None,
                             total_queries: int = None, window_size: int = None,
                             is_cooling: bool = False):
         """更新Cookie状态"""
-        cookie_id = f"cookie_{index}"
+        state = self._states[index]
         
         update_data = {
             "valid": is_valid,
-            "last_checked": datetime.now().isoformat()
+            "last_checked": self._now_iso(),
+            "last_checked_ts": time.time()
         }
         
         # 只在有效时更新username
@@ -1188,9 +1847,30 @@ class GrokCookieManager(BaseCookieManager):
             update_data["error"] = error
             
         # 更新状态
-        self.cookie_states[cookie_id].update(update_data)
+        with self._state_lock.write():
+            state.update(update_data)
         
-        self._save_state()
+        self._mark_dirty()
+    
+    def _cooldown_duration(self, index: int) -> float:
+        """获取冷却时长（秒），有请求额度窗口大小时使用窗口大小，否则使用配置的冷却时间"""
+        window_size = self._states[index].get("window_size")
+        if window_size:
+            return int(window_size)
+        return self._cooldown_seconds
+    
+    def _strategy_table(self) -> Dict[str, Callable[[], int]]:
+        """轮换策略名称到选择函数的映射，额外支持most_remaining策略"""
+        strategies = super()._strategy_table()
+        strategies["most_remaining"] = self._most_remaining_index
+        return strategies
+    
+    def _most_remaining_index(self) -> int:
+        """选择剩余额度最多的可用索引（调用前需确保存在可用索引）"""
+        return max(
+            self._alive_indices(),
+            key=lambda i: self._states[i].get("remaining_queries", 0) or 0
+        )
     
     def get_next_cookie(self) -> str:
         """获取下一个要使用的Cookie
@@ -1204,66 +1884,24 @@ class GrokCookieManager(BaseCookieManager):
         if not self.cookies:
             raise Exception("没有可用的Grok.com Cookie")
         
-        # 验证所有Cookie
-        self.validate_all_cookies()
-        
-        if not self.valid_indices:
-            raise Exception("所有Grok.com Cookie都已失效")
-        
-        # 根据不同模式选择Cookie
-        rotation_strategy = self.get_rotation_strategy()
-        
-        if rotation_strategy == "round_robin":
-            # 轮询模式
-            if self.current_index in self.valid_indices:
-                current_position = self.valid_indices.index(self.current_index)
-                next_position = (current_position + 1) % len(self.valid_indices)
-                self.current_index = self.valid_indices[next_position]
-            else:
-                self.current_index = self.valid_indices[0]
-        elif rotation_strategy == "random":
-            # 随机模式
-            self.current_index = random.choice(self.valid_indices)
-        elif rotation_strategy == "least_used":
-            # 最少使用模式
-            self.current_index = min(
-                self.valid_indices, 
-                key=lambda i: self.cookie_states.get(f"cookie_{i}", {}).get("request_count", 0)
-            )
-        elif rotation_strategy == "most_remaining":
-            # 选择剩余额度最多的Cookie
-            self.current_index = max(
-                self.valid_indices,
-                key=lambda i: self.cookie_states.get(f"cookie_{i}", {}).get("remaining_queries", 0) or 0
-            )
-        else:
-            # 默认轮询
-            if self.current_index in self.valid_indices:
-                current_position = self.valid_indices.index(self.current_index)
-                next_position = (current_position + 1) % len(self.valid_indices)
-                self.current_index = self.valid_indices[next_position]
-            else:
-                self.current_index = self.valid_indices[0]
-        
-        # 更新使用记录
-        cookie_id = f"cookie_{self.current_index}"
-        self.cookie_states[cookie_id]["last_used"] = datetime.now().isoformat()
+        index = self._pick_next_index("所有Grok.com Cookie都已失效")
+        state = self._states[index]
         
         # 如果有请求额度信息，减少剩余额度
-        remaining = self.cookie_states[cookie_id].get("remaining_queries")
-        if remaining is not None:
-            # 确保为整数并减1
-            remaining = int(remaining) if remaining is not None else 0
-            self.cookie_states[cookie_id]["remaining_queries"] = max(0, remaining - 1)
-            
-            # 如果剩余额度为0，标记为冷却
-            if self.cookie_states[cookie_id]["remaining_queries"] <= 0:
-                self.start_cooldown(self.current_index)
+        with self._state_lock.write():
+            remaining = state.get("remaining_queries")
+            if remaining is not None:
+                # 确保为整数并减1
+                remaining = max(0, int(remaining) - 1)
+                state["remaining_queries"] = remaining
         
-        # 保存状态
-        self._save_state()
+        # 如果剩余额度为0，标记为冷却
+        if remaining is not None and remaining <= 0:
+            self.start_cooldown(index)
         
-        return self.cookies[self.current_index]
+        self._mark_dirty()
+        
+        return self.cookies[index]
     
     def increment_request_count(self, index: int):
         """增加指定Cookie的请求计数
@@ -1272,11 +1910,8 @@ class GrokCookieManager(BaseCookieManager):
             index: Cookie索引
         """
         if 0 <= index < len(self.cookies):
-            cookie_id = f"cookie_{index}"
-            if cookie_id in self.cookie_states:
-                request_count = self.cookie_states[cookie_id].get("request_count", 0)
-                self.cookie_states[cookie_id]["request_count"] = int(request_count) + 1
-                self._save_state()
+            self._record_usage(index)
+            self._mark_dirty()
     
     def mark_cookie_invalid(self, index: int, reason: str = ""):
         """标记Cookie为无效
@@ -1286,97 +1921,67 @@ class GrokCookieManager(BaseCookieManager):
             reason: 无效原因
         """
         if 0 <= index < len(self.cookies):
-            cookie_id = f"cookie_{index}"
-            if cookie_id in self.cookie_states:
-                self.cookie_states[cookie_id]["valid"] = False
-                self.cookie_states[cookie_id]["error"] = reason
-                self.cookie_states[cookie_id]["invalidated_at"] = datetime.now().isoformat()
-                
-                # 从有效索引列表中移除
-                if index in self.valid_indices:
-                    self.valid_indices.remove(index)
-                
-                logger.warning(f"已标记Grok.com Cookie {index} 为无效: {reason}")
-                self._save_state()
-    
-    def start_cooldown(self, index: int):
-        """开始Cookie冷却
-        
-        Args:
-            index: Cookie索引
-        """
-        if 0 <= index < len(self.cookies):
-            cookie_id = f"cookie_{index}"
-            if cookie_id in self.cookie_states:
-                # 获取窗口大小或使用默认冷却时间
-                window_size = self.cookie_states[cookie_id].get("window_size")
-                if window_size:
-                    # 使用窗口大小作为冷却时间（秒）
-                    window_size = int(window_size) if window_size is not None else 0
-                    next_available = datetime.now() + timedelta(seconds=window_size)
-                else:
-                    # 使用配置的冷却时间
-                    cooldown_minutes = self.get_cooldown_minutes()
-                    next_available = datetime.now() + timedelta(minutes=cooldown_minutes)
-                
-                self.cookie_states[cookie_id]["is_cooling"] = True
-                self.cookie_states[cookie_id]["next_available"] = next_available.isoformat()
+            state = self._states[index]
+            with self._state_lock.write():
+                state["valid"] = False
+                state["error"] = reason
+                state["invalidated_at"] = self._now_iso()
                 
-                # 从有效索引列表中移除
-                if index in self.valid_indices:
-                    self.valid_indices.remove(index)
-                
-                logger.info(f"Grok.com Cookie {index} 开始冷却，将在 {next_available} 后可用")
-                self._save_state()
+                # 标记为不可用
+                self._set_alive(index, False)
+            
+            logger.warning(f"已标记Grok.com Cookie {index} 为无效: {reason}")
+            if self._listeners:
+                self._emit("invalid", {"index": index, "reason": reason})
+            self._mark_dirty()
     
     def check_cooldowns(self):
         """检查所有Cookie的冷却状态"""
-        for i in range(len(self.cookies)):
-            cookie_id = f"cookie_{i}"
-            state = self.cookie_states.get(cookie_id, {})
+        # 只处理冷却截止时间已过的Cookie
+        for i in self._pop_expired_cooldowns():
+            state = self._states[i]
             
-            if state.get("is_cooling", False) and state.get("next_available"):
-                next_available = datetime.fromisoformat(state["next_available"])
-                
-                if datetime.now() >= next_available:
-                    # 冷却结束，但需要验证Cookie以确认额度已恢复
-                    is_valid = self.validate_cookie(i)
-                    
-                    # 如果验证成功且Cookie有效，添加回有效索引列表
-                    if is_valid and i not in self.valid_indices:
-                        self.valid_indices.append(i)
-                        logger.info(f"Grok.com Cookie {i} 冷却结束，现在可用")
-                    elif not is_valid:
-                        logger.warning(f"Grok.com Cookie {i} 冷却结束，但验证失败")
-                    
-                    self._save_state()
+            # 冷却结束，但需要验证Cookie以确认额度已恢复
+            is_valid = self.validate_cookie(i)
+            
+            # 如果验证成功且Cookie有效，重新标记为可用
+            if is_valid and not self._alive_mask[i]:
+                with self._state_lock.write():
+                    self._set_alive(i, True)
+                logger.info(f"Grok.com Cookie {i} 冷却结束，现在可用")
+                if self._listeners:
+                    self._emit("cooldown_end", {"index": i})
+            elif not is_valid and state.get("is_cooling", False):
+                # 额度仍未恢复，重新开始冷却，避免之后每次请求都重新验证
+                self.start_cooldown(i)
+            elif not is_valid:
+                logger.warning(f"Grok.com Cookie {i} 冷却结束，但验证失败")
+            
+            self._mark_dirty()
     
-    def get_stats(self) -> Dict:
-        """获取所有Cookie的统计信息
+    def _build_stats(self) -> Dict:
+        """生成所有Cookie的统计信息
         
         Returns:
             Cookie统计信息
         """
         stats = {
             "total_cookies": len(self.cookies),
-            "valid_cookies": len(self.valid_indices),
+            "valid_cookies": self._alive_count,
             "current_index": self.current_index,
             "cookies": [],
             "cf_challenge_count": self.cf_challenge_count,
             "last_cf_challenge": self.last_cf_challenge.isoformat() if self.last_cf_challenge else None
         }
         
-        for i, cookie in enumerate(self.cookies):
-            cookie_id = f"cookie_{i}"
-            state = self.cookie_states.get(cookie_id, {})
-            cookie_preview = cookie[:20] + "..." if len(cookie) > 20 else cookie
+        for i, state in enumerate(self._states):
             
             stats["cookies"].append({
                 "index": i,
-                "preview": cookie_preview,
+                "preview": self._previews[i],
                 "valid": state.get("valid", False),
                 "username": state.get("username", "UNKNOWN"),
-                "request_count": state.get("request_count", 0),
+                "request_count": self.request_counts[i],
                 "remaining_queries": state.get("remaining_queries"),
                 "total_queries": state.get("total_queries"),
                 "last_used": state.get("last_used"),